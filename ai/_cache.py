@@ -0,0 +1,52 @@
+"""
+Small in-process TTL cache for DB-derived values (baselines, flag inputs, contexts).
+Entries are keyed per calendar day and dropped wholesale by clear() when new data lands.
+Thread-safe — the dashboard calls these from Streamlit's script threads.
+"""
+
+import functools
+import threading
+import time
+from datetime import date
+
+from config.settings import AI_CACHE_TTL
+
+_lock = threading.Lock()
+_entries: dict[tuple, tuple[float, object]] = {}
+
+
+def ttl_cache(seconds: int | None = None, key=None):
+    """
+    Memoize a function for `seconds` (default AI_CACHE_TTL). `key` maps the call's
+    arguments to the hashable part of the cache key; by default all arguments are used.
+    AI_CACHE_TTL=0 disables every ttl_cache.
+    """
+    def decorator(func):
+        ttl = AI_CACHE_TTL if seconds is None else seconds
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if AI_CACHE_TTL <= 0:
+                return func(*args, **kwargs)
+
+            arg_key = key(*args, **kwargs) if key else (args, tuple(sorted(kwargs.items())))
+            cache_key = (func.__qualname__, date.today(), arg_key)
+            now = time.monotonic()
+            with _lock:
+                hit = _entries.get(cache_key)
+            if hit and hit[0] > now:
+                return hit[1]
+
+            value = func(*args, **kwargs)
+            with _lock:
+                _entries[cache_key] = (now + ttl, value)
+            return value
+
+        return wrapper
+
+    return decorator
+
+
+def clear():
+    with _lock:
+        _entries.clear()
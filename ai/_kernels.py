@@ -0,0 +1,14 @@
+"""
+Numeric kernels for flag checks — plain NumPy over float64 arrays.
+Callers convert rows to arrays at the boundary; nothing in here touches the DB or rows.
+"""
+
+import numpy as np
+
+
+def skin_temp_delta(temps: np.ndarray) -> tuple[float, float, float]:
+    """(delta, baseline, latest) for a newest-first series; baseline is the mean of all but the latest."""
+    latest = float(temps[0])
+    baseline = float(temps[1:].mean())
+    return latest - baseline, baseline, latest
+
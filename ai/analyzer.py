@@ -1,91 +1,216 @@
 """
-Gemini analysis engine.
+LLM analysis engine — prompt assembly, caching and persistence on top of ai/providers.py.
 """
 
+import asyncio
+import hashlib
 import logging
-from datetime import date
-
-import google.generativeai as genai
+import os
+import time
+from datetime import date, datetime, timezone
+from pathlib import Path
 
 from ai.context import (
+    TimeWindow,
     build_daily_context,
     build_qa_context,
     build_weekly_context,
+    get_baselines,
     get_hrv_baseline,
-    get_rhr_baseline,
 )
 from ai.flags import Flag, run_all_checks
 from ai.prompts import (
+    DAILY_INSIGHT_PROMPT,
     FLAG_ANALYSIS_PROMPT,
     QA_SYSTEM_ADDENDUM,
     WEEKLY_REPORT_PROMPT,
 )
+from ai.providers import get_provider
+from ai.ratelimit import RateLimiter
 from config.personal_context import get_system_prompt
 from config.settings import (
-    GEMINI_API_KEY,
+    CACHE_DIR,
     GEMINI_ANALYSIS_MODEL,
+    GEMINI_MAX_CONCURRENCY,
+    GEMINI_RPM,
     GEMINI_SUMMARY_MODEL,
+    LLM_CACHE_TTL,
 )
 from db.database import get_db
 from db.models import AIInsight
 
 logger = logging.getLogger(__name__)
 
-genai.configure(api_key=GEMINI_API_KEY)
+_LLM_CACHE_DIR = CACHE_DIR / "llm"
+_limiter = RateLimiter(rpm=GEMINI_RPM, max_concurrency=GEMINI_MAX_CONCURRENCY)
+
+# Insights are persisted by a background writer in batches of up to _INSIGHT_BATCH_MAX,
+# flushed at most _INSIGHT_FLUSH_SECONDS after the first queued item. A failed batch is
+# re-queued up to _INSIGHT_MAX_ATTEMPTS times; main.py drains the queue on shutdown.
+_INSIGHT_BATCH_MAX = 20
+_INSIGHT_FLUSH_SECONDS = 2.0
+_INSIGHT_MAX_ATTEMPTS = 3
+_insight_queue: asyncio.Queue[tuple[dict, int]] = asyncio.Queue()  # (row, attempts so far)
+_writer_task: asyncio.Task | None = None
+
+
+def _cache_path(model_name: str, system: str, prompt: str, max_tokens: int) -> Path:
+    key = hashlib.sha256(f"{model_name}|{system}|{prompt}|{max_tokens}".encode()).hexdigest()
+    return _LLM_CACHE_DIR / f"{key}.txt"
+
+
+def _cache_get(path: Path) -> str | None:
+    try:
+        if time.time() - path.stat().st_mtime < LLM_CACHE_TTL:
+            return path.read_text(encoding="utf-8")
+    except OSError:
+        pass
+    return None
 
 
-def _generate(model_name: str, system: str, prompt: str, max_tokens: int = 8192) -> str:
+def _cache_set(path: Path, content: str):
+    """Best-effort write — a cache failure must never fail the request."""
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        tmp.write_text(content, encoding="utf-8")
+        os.replace(tmp, path)
+    except OSError as e:
+        logger.warning(f"Could not write LLM cache entry: {e}")
+
+
+async def _generate(
+    model_name: str,
+    system: str,
+    prompt: str,
+    max_tokens: int = 8192,
+    cache: bool = True,
+) -> str:
+    """
+    Identical (model, system, prompt, max_tokens) calls within LLM_CACHE_TTL are
+    served from disk. Pass cache=False for inputs that should always hit the API.
+    """
+    cache_path = None
+    if cache and LLM_CACHE_TTL > 0:
+        cache_path = _cache_path(model_name, system, prompt, max_tokens)
+        cached = _cache_get(cache_path)
+        if cached is not None:
+            logger.info("LLM response served from cache")
+            return cached
+
+    provider = get_provider()
     try:
-        model = genai.GenerativeModel(model_name=model_name, system_instruction=system)
-        response = model.generate_content(
-            prompt,
-            generation_config=genai.GenerationConfig(max_output_tokens=max_tokens),
-        )
-        return response.text
+        async with _limiter.slot():
+            content = await provider.generate(model_name, system, prompt, max_tokens)
     except Exception as e:
         from slack_bot.alerts import schedule_alert
-        schedule_alert("Gemini API", e, f"model: {model_name}")
+        schedule_alert(f"{provider.name} API", e, f"model: {model_name}")
         raise
 
+    # Never cache an empty answer — it would be replayed for the whole LLM_CACHE_TTL
+    if cache_path is not None and content.strip():
+        _cache_set(cache_path, content)
+    return content
 
-def _save_insight(insight_type: str, content: str):
+
+async def _insight_writer():
+    """Drain the insight queue in batches — one session/commit per batch, off the event loop."""
+    while True:
+        batch = [await _insight_queue.get()]
+        deadline = time.monotonic() + _INSIGHT_FLUSH_SECONDS
+        while len(batch) < _INSIGHT_BATCH_MAX:
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(_insight_queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+        try:
+            await asyncio.to_thread(_write_insights, [row for row, _ in batch])
+        except Exception as e:
+            _retry_insights(batch, e)
+            await asyncio.sleep(_INSIGHT_FLUSH_SECONDS)
+        finally:
+            for _ in batch:
+                _insight_queue.task_done()
+
+
+def _retry_insights(batch: list[tuple[dict, int]], error: Exception):
+    """Re-queue a failed batch; rows that keep failing are dropped with an alert."""
+    from slack_bot.alerts import schedule_alert
+
+    retry = [(row, attempts + 1) for row, attempts in batch if attempts + 1 < _INSIGHT_MAX_ATTEMPTS]
+    for item in retry:
+        _insight_queue.put_nowait(item)
+    dropped = len(batch) - len(retry)
+    logger.error(f"Failed to save {len(batch)} AI insight(s) — {len(retry)} re-queued, {dropped} dropped: {error}")
+    if dropped:
+        schedule_alert("AI insight writer", error, f"{dropped} insight(s) dropped after {_INSIGHT_MAX_ATTEMPTS} attempts")
+
+
+def _write_insights(batch: list[dict]):
     with get_db() as db:
-        db.add(AIInsight(insight_type=insight_type, content=content))
+        db.add_all([AIInsight(**row) for row in batch])
 
 
-def generate_daily_insight(context: str, flags: list[Flag]) -> str:
+def _save_insight(insight_type: str, content: str):
+    """
+    Queue an insight for persistence — callers don't wait on the DB.
+    The writer task is started on first use, inside the running event loop.
+    """
+    global _writer_task
+    if _writer_task is None or _writer_task.done():
+        _writer_task = asyncio.get_running_loop().create_task(_insight_writer())
+    _insight_queue.put_nowait(({
+        "insight_type": insight_type,
+        "content": content,
+        "created_at": datetime.now(timezone.utc),
+    }, 0))
+
+
+async def flush_insights(timeout: float = 10.0):
+    """Wait for queued insights to be written. Called from main.py on shutdown."""
+    if _writer_task is None or _writer_task.done():
+        return
+    try:
+        await asyncio.wait_for(_insight_queue.join(), timeout)
+    except asyncio.TimeoutError:
+        logger.error(f"Shutting down with {_insight_queue.qsize()} AI insight(s) unsaved")
+
+
+async def generate_daily_insight(
+    context: str,
+    flags: list[Flag],
+    baselines: tuple[float | None, float | None] | None = None,
+) -> str:
     """
     Returns 1-2 sentences of insight only — no formatting, no metrics.
     morning.py handles layout; this just adds the AI angle.
+    Pass `baselines` when the caller already fetched them for the context.
     """
-    hrv_baseline = get_hrv_baseline()
-    rhr_baseline = get_rhr_baseline()
+    hrv_baseline, rhr_baseline = baselines or get_baselines()
     system = get_system_prompt(hrv_baseline=hrv_baseline, rhr_baseline=rhr_baseline)
 
     flag_text = ""
     if flags:
         flag_text = "\n\nActive flags:\n" + "\n".join(f"- {f.message}" for f in flags)
 
-    prompt = (
-        "Based on today's data, give Jay one sharp observation and one concrete action for today. "
-        "Max 2 sentences. Lead with the most important signal. Skip anything obvious. "
-        "No fluff, no 'your recovery is X%' restatements — he can already see the numbers.\n\n"
-        f"{context}{flag_text}"
-    )
+    prompt = f"{DAILY_INSIGHT_PROMPT}\n\n{context}{flag_text}"
 
-    content = _generate(GEMINI_SUMMARY_MODEL, system, prompt, max_tokens=8192)
+    content = await _generate(GEMINI_SUMMARY_MODEL, system, prompt, max_tokens=8192)
     _save_insight("daily", content)
     logger.info("Daily insight generated")
     return content.strip()
 
 
-def generate_weekly_report() -> str:
-    hrv_baseline = get_hrv_baseline()
-    rhr_baseline = get_rhr_baseline()
+async def generate_weekly_report() -> str:
+    window = TimeWindow()
+    hrv_baseline, rhr_baseline = get_baselines(window=window)
     system = get_system_prompt(hrv_baseline=hrv_baseline, rhr_baseline=rhr_baseline)
-    context = build_weekly_context()
+    context = build_weekly_context(window=window)
 
-    content = _generate(
+    content = await _generate(
         GEMINI_ANALYSIS_MODEL, system,
         f"{WEEKLY_REPORT_PROMPT}\n\n{context}",
         max_tokens=8192,
@@ -95,19 +220,20 @@ def generate_weekly_report() -> str:
     return content
 
 
-def answer_question(question: str) -> str:
-    hrv_baseline = get_hrv_baseline()
-    rhr_baseline = get_rhr_baseline()
+async def answer_question(question: str) -> str:
+    window = TimeWindow()
+    baselines = get_baselines(window=window)
+    hrv_baseline, rhr_baseline = baselines
     system = get_system_prompt(hrv_baseline=hrv_baseline, rhr_baseline=rhr_baseline)
     system += f"\n\n{QA_SYSTEM_ADDENDUM}"
-    context = build_qa_context(question)
+    context = build_qa_context(question, baselines=baselines, window=window)
 
-    content = _generate(GEMINI_ANALYSIS_MODEL, system, context, max_tokens=8192)
+    content = await _generate(GEMINI_ANALYSIS_MODEL, system, context, max_tokens=8192, cache=False)
     _save_insight("qa", content)
     return content
 
 
-def analyze_flags(flags: list[Flag]) -> str:
+async def analyze_flags(flags: list[Flag]) -> str:
     if not flags:
         return ""
 
@@ -115,7 +241,7 @@ def analyze_flags(flags: list[Flag]) -> str:
     system = get_system_prompt(hrv_baseline=hrv_baseline)
     flag_details = "\n".join(f"- {f.key}: {f.message}" for f in flags)
 
-    content = _generate(
+    content = await _generate(
         GEMINI_SUMMARY_MODEL, system,
         f"{FLAG_ANALYSIS_PROMPT}\n\nActive flags:\n{flag_details}",
         max_tokens=8192,
@@ -3,11 +3,59 @@ Builds the data context payload to include in AI prompts.
 All ORM data is extracted to plain values inside the session to avoid DetachedInstanceError.
 """
 
-from datetime import date, datetime, timedelta, timezone
-from statistics import mean
+import re
+from dataclasses import dataclass, field
+from datetime import date, datetime, time, timedelta, timezone
 
-from db.database import get_db
-from db.models import AIInsight, JournalEntry, WhoopCycle, WhoopRecovery, WhoopSleep, WhoopWorkout
+import numpy as np
+from sqlalchemy import func, select
+
+from ai import _cache
+from ai._cache import ttl_cache
+from db.database import get_db, use_db
+from db.models import AIInsight, DailySummary, JournalEntry, WhoopCycle, WhoopRecovery, WhoopSleep, WhoopWorkout
+
+
+# Filler that carries no signal for the model — stripped from free-text journal notes
+_FILLER_RE = re.compile(
+    r"\b(?:honestly|basically|actually|literally|really|just|kind of|sort of|"
+    r"i think|i guess|i feel like|to be honest|please|thanks|thank you)\b[,]?\s*",
+    re.IGNORECASE,
+)
+
+
+def _fmt(value) -> str:
+    """Compact number formatting: 45.0 → "45", 33.85 → "33.85"."""
+    return f"{value:g}" if isinstance(value, float) else str(value)
+
+
+def _join(values) -> str:
+    return ",".join(_fmt(v) for v in values)
+
+
+def _compress_notes(notes: str) -> str:
+    return " ".join(_FILLER_RE.sub("", notes).split())
+
+
+_SPARK_BARS = "▁▂▃▄▅▆▇█"
+
+
+def _sparkline(values) -> str:
+    lo, hi = min(values), max(values)
+    if hi == lo:
+        return _SPARK_BARS[3] * len(values)
+    return "".join(_SPARK_BARS[round((v - lo) / (hi - lo) * 7)] for v in values)
+
+
+def _trend(values) -> str:
+    """Sparkline + range + mean/std — carries the shape of a series in a few tokens."""
+    if not values:
+        return "n/a"
+    arr = np.asarray(values, dtype=np.float64)
+    return (
+        f"{_sparkline(values)} {_fmt(float(arr.min()))}-{_fmt(float(arr.max()))} "
+        f"(μ={arr.mean():.1f} σ={arr.std():.1f})"
+    )
 
 
 def _milli_to_hours(ms: int | None) -> float | None:
@@ -22,43 +70,104 @@ def _pct(part: int | None, total: int | None) -> float | None:
     return round((part / total) * 100, 1)
 
 
-def get_hrv_baseline(days: int = 30) -> float | None:
-    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
-    with get_db() as db:
-        values = [
-            r.hrv_rmssd_milli for r in
-            db.query(WhoopRecovery)
-            .filter(WhoopRecovery.created_at >= cutoff)
-            .filter(WhoopRecovery.hrv_rmssd_milli.isnot(None))
-            .all()
-        ]
-    return round(mean(values), 1) if values else None
+@dataclass(slots=True)
+class TimeWindow:
+    """
+    One clock reading per request. Entry points create it once and pass it down so
+    baselines and context queries all cut off relative to the same instant.
+    """
+    now: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
 
+    def ago(self, days: int) -> datetime:
+        return self.now - timedelta(days=days)
 
-def get_rhr_baseline(days: int = 30) -> float | None:
-    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
-    with get_db() as db:
-        values = [
-            r.resting_heart_rate for r in
-            db.query(WhoopRecovery)
-            .filter(WhoopRecovery.created_at >= cutoff)
-            .filter(WhoopRecovery.resting_heart_rate.isnot(None))
-            .all()
-        ]
-    return round(mean(values), 1) if values else None
+
+def _baseline_key(days: int = 30, window: TimeWindow | None = None, db=None):
+    # The cutoff date the query filters on — a past TimeWindow must not share today's entry
+    return days, (window or TimeWindow()).ago(days).date()
 
 
-def build_daily_context(target_date: date | None = None) -> str:
-    if target_date is None:
-        target_date = date.today()
+@ttl_cache(key=_baseline_key)
+def get_hrv_baseline(days: int = 30, window: TimeWindow | None = None, db=None) -> float | None:
+    cutoff = (window or TimeWindow()).ago(days)
+    with use_db(db) as db:
+        avg = (
+            db.query(func.avg(DailySummary.hrv_avg))
+            .filter(DailySummary.date >= cutoff.date())
+            .scalar()
+        )
+    return round(float(avg), 1) if avg is not None else None
+
 
-    window_start = datetime(target_date.year, target_date.month, target_date.day, tzinfo=timezone.utc) - timedelta(days=1)
+@ttl_cache(key=_baseline_key)
+def get_rhr_baseline(days: int = 30, window: TimeWindow | None = None, db=None) -> float | None:
+    cutoff = (window or TimeWindow()).ago(days)
+    with use_db(db) as db:
+        avg = (
+            db.query(func.avg(DailySummary.rhr_avg))
+            .filter(DailySummary.date >= cutoff.date())
+            .scalar()
+        )
+    return round(float(avg), 1) if avg is not None else None
+
+
+@ttl_cache(key=_baseline_key)
+def get_baselines(
+    days: int = 30, window: TimeWindow | None = None, db=None,
+) -> tuple[float | None, float | None]:
+    """(HRV, RHR) baselines in one round-trip — use when a request needs both."""
+    with use_db(db) as db:
+        return _baselines(db, (window or TimeWindow()).ago(days))
+
+
+def _baselines(db, cutoff: datetime) -> tuple[float | None, float | None]:
+    """get_baselines on an already-open session — lets a caller share its connection."""
+    hrv, rhr = (
+        db.query(func.avg(DailySummary.hrv_avg), func.avg(DailySummary.rhr_avg))
+        .filter(DailySummary.date >= cutoff.date())
+        .one()
+    )
+    return (
+        round(float(hrv), 1) if hrv is not None else None,
+        round(float(rhr), 1) if rhr is not None else None,
+    )
+
+
+def clear_context_cache():
+    """Drop cached baselines, flag inputs and contexts — call whenever new data lands."""
+    _cache.clear()
+
+
+def build_daily_context(
+    target_date: date | None = None,
+    baselines: tuple[float | None, float | None] | None = None,
+    db=None,
+) -> str:
+    return _build_daily_context(target_date or date.today(), baselines, db)
+
+
+# Daily context is stable between syncs — cached per (date, baselines)
+@ttl_cache(seconds=900, key=lambda target_date, baselines, db: (target_date, baselines))
+def _build_daily_context(
+    target_date: date,
+    baselines: tuple[float | None, float | None] | None,
+    db=None,
+) -> str:
+
+    window_start = datetime.combine(target_date, time.min, tzinfo=timezone.utc) - timedelta(days=1)
     window_end = window_start + timedelta(days=2)
     seven_day_cutoff = window_start - timedelta(days=7)
 
-    with get_db() as db:
+    with use_db(db) as db:
         r = (
-            db.query(WhoopRecovery)
+            db.query(
+                WhoopRecovery.recovery_score,
+                WhoopRecovery.hrv_rmssd_milli,
+                WhoopRecovery.resting_heart_rate,
+                WhoopRecovery.spo2_percentage,
+                WhoopRecovery.skin_temp_celsius,
+                WhoopRecovery.score_state,
+            )
             .filter(WhoopRecovery.created_at >= window_start)
             .filter(WhoopRecovery.created_at < window_end)
             .order_by(WhoopRecovery.created_at.desc())
@@ -74,7 +183,17 @@ def build_daily_context(target_date: date | None = None) -> str:
         } if r else None
 
         s = (
-            db.query(WhoopSleep)
+            db.query(
+                WhoopSleep.total_in_bed_milli,
+                WhoopSleep.slow_wave_milli,
+                WhoopSleep.rem_sleep_milli,
+                WhoopSleep.light_sleep_milli,
+                WhoopSleep.awake_count,
+                WhoopSleep.sleep_performance_pct,
+                WhoopSleep.sleep_efficiency_pct,
+                WhoopSleep.respiratory_rate,
+                WhoopSleep.sleep_debt_milli,
+            )
             .filter(WhoopSleep.end >= window_start)
             .filter(WhoopSleep.end < window_end)
             .order_by(WhoopSleep.end.desc())
@@ -94,14 +213,22 @@ def build_daily_context(target_date: date | None = None) -> str:
 
         recent_recoveries = [
             {"hrv": r.hrv_rmssd_milli, "score": r.recovery_score}
-            for r in db.query(WhoopRecovery)
+            for r in db.query(WhoopRecovery.hrv_rmssd_milli, WhoopRecovery.recovery_score)
             .filter(WhoopRecovery.created_at >= seven_day_cutoff)
+            .filter(WhoopRecovery.created_at < window_end)
             .order_by(WhoopRecovery.created_at.desc())
+            .limit(7)
             .all()
         ]
 
         j = (
-            db.query(JournalEntry)
+            db.query(
+                JournalEntry.date,
+                JournalEntry.alcohol_units,
+                JournalEntry.stress_level,
+                JournalEntry.late_caffeine,
+                JournalEntry.notes,
+            )
             .filter(JournalEntry.date >= (target_date - timedelta(days=2)))
             .order_by(JournalEntry.date.desc())
             .first()
@@ -114,10 +241,13 @@ def build_daily_context(target_date: date | None = None) -> str:
             "notes": j.notes,
         } if j else None
 
-    hrv_baseline = get_hrv_baseline()
-    rhr_baseline = get_rhr_baseline()
+        if baselines is None:
+            baselines = _baselines(db, TimeWindow().ago(30))
 
-    lines = [f"=== Daily Data Context: {target_date} ===\n"]
+    hrv_baseline, rhr_baseline = baselines
+
+    # Baselines are already in the system prompt — only deltas are repeated here
+    lines = [f"=== Daily {target_date} ===\n"]
 
     if recovery:
         hrv = recovery["hrv"]
@@ -125,11 +255,13 @@ def build_daily_context(target_date: date | None = None) -> str:
         if hrv and hrv_baseline:
             delta_pct = round((hrv - hrv_baseline) / hrv_baseline * 100, 1)
             direction = "↑" if delta_pct >= 0 else "↓"
-            hrv_vs_baseline = f" ({direction}{abs(delta_pct)}% vs {hrv_baseline}ms baseline)"
-        lines.append(f"RECOVERY: {recovery['score']}% | State: {recovery['state']}")
-        lines.append(f"HRV: {hrv}ms{hrv_vs_baseline}")
-        lines.append(f"RHR: {recovery['rhr']}bpm (baseline: {rhr_baseline}bpm)")
-        lines.append(f"SpO2: {recovery['spo2']}% | Skin temp: {recovery['skin_temp']}°C")
+            hrv_vs_baseline = f" ({direction}{abs(delta_pct)}% vs baseline)"
+        rhr_vs_baseline = ""
+        if recovery["rhr"] and rhr_baseline:
+            rhr_vs_baseline = f" ({round(recovery['rhr'] - rhr_baseline, 1):+g} vs baseline)"
+        lines.append(f"RECOVERY: {recovery['score']}% ({recovery['state']})")
+        lines.append(f"HRV: {_fmt(hrv)}ms{hrv_vs_baseline}")
+        lines.append(f"RHR: {recovery['rhr']}{rhr_vs_baseline} | SpO2: {_fmt(recovery['spo2'])}% | Skin: {_fmt(recovery['skin_temp'])}°C")
     else:
         lines.append("RECOVERY: No data for this period")
 
@@ -141,115 +273,132 @@ def build_daily_context(target_date: date | None = None) -> str:
         rem_pct = _pct(sleep["rem_sleep_milli"], sleep["total_in_bed_milli"])
         light_pct = _pct(sleep["light_sleep_milli"], sleep["total_in_bed_milli"])
         debt_h = _milli_to_hours(sleep["debt_milli"])
-        lines.append(f"SLEEP: {total_h}h in bed | Performance: {sleep['performance_pct']}% | Efficiency: {sleep['efficiency_pct']}%")
-        lines.append(f"Stages: {deep_pct}% deep / {rem_pct}% REM / {light_pct}% light")
-        lines.append(f"Disturbances: {sleep['awake_count']} | Resp rate: {sleep['respiratory_rate']} rpm")
-        lines.append(f"Sleep debt: {debt_h}h" if debt_h else "Sleep debt: unknown")
+        lines.append(f"SLEEP: {_fmt(total_h)}h in bed | Perf: {_fmt(sleep['performance_pct'])}% | Eff: {_fmt(sleep['efficiency_pct'])}%")
+        lines.append(f"Stages % deep/REM/light: {_fmt(deep_pct)}/{_fmt(rem_pct)}/{_fmt(light_pct)}")
+        lines.append(
+            f"Disturbances: {sleep['awake_count']} | Resp: {_fmt(sleep['respiratory_rate'])} | "
+            f"Debt: {_fmt(debt_h) + 'h' if debt_h else 'unknown'}"
+        )
     else:
         lines.append("SLEEP: No data for this period")
 
     lines.append("")
 
     if recent_recoveries:
-        hrv_trend = [r["hrv"] for r in recent_recoveries if r["hrv"]]
-        rec_trend = [r["score"] for r in recent_recoveries if r["score"]]
-        lines.append(f"7-DAY TREND — HRV: {hrv_trend} | Recovery scores: {rec_trend}")
+        # Queried newest-first; sparklines read oldest → newest
+        hrv_trend = [r["hrv"] for r in reversed(recent_recoveries) if r["hrv"]]
+        rec_trend = [r["score"] for r in reversed(recent_recoveries) if r["score"]]
+        lines.append(f"7d HRV: {_trend(hrv_trend)} | 7d recovery: {_trend(rec_trend)}")
 
     if journal:
         lines.append("")
-        lines.append(f"LAST JOURNAL ({journal['date']}): alcohol={journal['alcohol']} units | stress={journal['stress']}/5 | late_caffeine={journal['late_caffeine']}")
+        lines.append(f"LAST JOURNAL {journal['date']}: alcohol={journal['alcohol']} stress={journal['stress']}/5 late_caffeine={journal['late_caffeine']}")
         if journal["notes"]:
-            lines.append(f"Notes: {journal['notes']}")
+            lines.append(f"Notes: {_compress_notes(journal['notes'])}")
 
     return "\n".join(lines)
 
 
-def build_weekly_context(weeks_back: int = 1) -> str:
-    end = datetime.now(timezone.utc)
-    start = end - timedelta(weeks=weeks_back)
-    four_weeks_ago = end - timedelta(weeks=4)
+def build_weekly_context(weeks_back: int = 1, window: TimeWindow | None = None) -> str:
+    window = window or TimeWindow()
+    end = window.now
+    start = window.ago(7 * weeks_back)
+    four_weeks_ago = window.ago(28)
 
+    # Core selects return plain Row tuples — nothing here needs ORM instances
     with get_db() as db:
-        recoveries = [
-            {"date": str(r.created_at.date()), "hrv": r.hrv_rmssd_milli, "score": r.recovery_score}
-            for r in db.query(WhoopRecovery)
-            .filter(WhoopRecovery.created_at >= start)
+        recoveries = db.execute(
+            select(WhoopRecovery.hrv_rmssd_milli, WhoopRecovery.recovery_score)
+            .where(WhoopRecovery.created_at >= start)
             .order_by(WhoopRecovery.created_at)
-            .all()
-        ]
-        sleeps = [
-            {"total_milli": s.total_in_bed_milli, "debt_milli": s.sleep_debt_milli}
-            for s in db.query(WhoopSleep)
-            .filter(WhoopSleep.end >= start)
+        ).all()
+        sleeps = db.execute(
+            select(WhoopSleep.total_in_bed_milli, WhoopSleep.sleep_debt_milli)
+            .where(WhoopSleep.end >= start)
             .order_by(WhoopSleep.end)
-            .all()
+        ).all()
+        # Workouts and journals are only ever formatted — stream them straight into
+        # their output lines (one pass, no row list) for long multi-week windows
+        workout_items = [
+            f"{sport} {_fmt(strain)}" if strain else sport
+            for sport, strain in db.execute(
+                select(WhoopWorkout.sport_name, WhoopWorkout.strain_score)
+                .where(WhoopWorkout.start >= start)
+                .order_by(WhoopWorkout.start)
+                .execution_options(yield_per=200)
+            )
         ]
-        workouts = [
-            {"sport": w.sport_name, "strain": w.strain_score}
-            for w in db.query(WhoopWorkout)
-            .filter(WhoopWorkout.start >= start)
-            .order_by(WhoopWorkout.start)
-            .all()
-        ]
-        journals = [
-            {"date": str(j.date), "alcohol": j.alcohol_units, "stress": j.stress_level,
-             "late_caffeine": j.late_caffeine, "notes": j.notes}
-            for j in db.query(JournalEntry)
-            .filter(JournalEntry.date >= start.date())
-            .order_by(JournalEntry.date)
-            .all()
-        ]
-        prev_hrvs = [
-            r.hrv_rmssd_milli for r in
-            db.query(WhoopRecovery)
-            .filter(WhoopRecovery.created_at >= four_weeks_ago)
-            .filter(WhoopRecovery.created_at < start)
-            .filter(WhoopRecovery.hrv_rmssd_milli.isnot(None))
-            .all()
+        journal_lines = [
+            f"JOURNAL {d}: alcohol={alcohol} stress={stress}/5 late_caffeine={late}"
+            + (f" notes={_compress_notes(notes)}" if notes else "")
+            for d, alcohol, stress, late, notes in db.execute(
+                select(
+                    JournalEntry.date,
+                    JournalEntry.alcohol_units,
+                    JournalEntry.stress_level,
+                    JournalEntry.late_caffeine,
+                    JournalEntry.notes,
+                )
+                .where(JournalEntry.date >= start.date())
+                .order_by(JournalEntry.date)
+                .execution_options(yield_per=200)
+            )
         ]
+        prev_hrv_avg = db.execute(
+            select(func.avg(DailySummary.hrv_avg))
+            .where(DailySummary.date >= four_weeks_ago.date())
+            .where(DailySummary.date < start.date())
+        ).scalar()
 
-    lines = [f"=== Weekly Data Context: {start.date()} to {end.date()} ===\n"]
+    lines = [f"=== Weekly {start.date()} to {end.date()} ===\n"]
 
     if recoveries:
-        hrv_vals = [r["hrv"] for r in recoveries if r["hrv"]]
-        rec_scores = [r["score"] for r in recoveries if r["score"]]
-        lines.append(f"RECOVERY SCORES: {rec_scores}")
-        lines.append(f"HRV VALUES (ms): {hrv_vals}")
-        if hrv_vals:
-            lines.append(f"HRV avg this week: {round(mean(hrv_vals), 1)}ms")
-        if prev_hrvs:
-            lines.append(f"HRV avg prev 4 weeks: {round(mean(prev_hrvs), 1)}ms")
+        # Rows → float matrix in one pass (None → NaN); isfinite masks drop missing values
+        hrv, scores = np.array(recoveries, dtype=np.float64).T
+        hrv_vals = hrv[np.isfinite(hrv)]
+        rec_scores = scores[np.isfinite(scores)]
+        lines.append(f"RECOVERY: {_join(rec_scores)}")
+        lines.append(f"HRV ms: {_join(hrv_vals)}")
+        if hrv_vals.size:
+            lines.append(f"HRV avg this week: {_fmt(round(float(hrv_vals.mean()), 1))}")
+        if prev_hrv_avg is not None:
+            lines.append(f"HRV avg prev 4 weeks: {_fmt(round(float(prev_hrv_avg), 1))}")
 
     lines.append("")
 
     if sleeps:
-        total_hours = [_milli_to_hours(s["total_milli"]) for s in sleeps if s["total_milli"]]
-        debt = _milli_to_hours(sleeps[-1]["debt_milli"]) if sleeps[-1]["debt_milli"] else "unknown"
-        lines.append(f"SLEEP (hours each night): {total_hours}")
-        lines.append(f"Sleep debt end of week: {debt}h")
+        total_milli, debt_milli = np.array(sleeps, dtype=np.float64).T
+        total_hours = np.round(total_milli[np.isfinite(total_milli) & (total_milli > 0)] / 3_600_000, 2)
+        debts = debt_milli[np.isfinite(debt_milli)]
+        lines.append(f"SLEEP h/night: {_join(total_hours)}")
+        debt_label = f"{_fmt(round(float(debts[-1]) / 3_600_000, 2))}h" if debts.size else "unknown"
+        lines.append(f"Sleep debt end of week: {debt_label}")
 
     lines.append("")
 
-    if workouts:
-        lines.append(f"WORKOUTS: {[w['sport'] for w in workouts]}")
-        lines.append(f"Strain scores: {[w['strain'] for w in workouts if w['strain']]}")
+    if workout_items:
+        lines.append("WORKOUTS (sport strain): " + ", ".join(workout_items))
 
     lines.append("")
 
-    for j in journals:
-        lines.append(f"JOURNAL {j['date']}: alcohol={j['alcohol']}, stress={j['stress']}/5, late_caffeine={j['late_caffeine']}, notes={j['notes']}")
+    lines.extend(journal_lines)
 
     return "\n".join(lines)
 
 
-def build_qa_context(question: str, days: int = 14) -> str:
-    daily = build_daily_context()
-    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+def build_qa_context(
+    question: str,
+    days: int = 14,
+    baselines: tuple[float | None, float | None] | None = None,
+    window: TimeWindow | None = None,
+) -> str:
+    daily = build_daily_context(baselines=baselines)
+    cutoff = (window or TimeWindow()).ago(days)
 
     with get_db() as db:
         recoveries = [
             {"date": str(r.created_at.date()), "hrv": r.hrv_rmssd_milli, "score": r.recovery_score}
-            for r in db.query(WhoopRecovery)
+            for r in db.query(WhoopRecovery.created_at, WhoopRecovery.hrv_rmssd_milli, WhoopRecovery.recovery_score)
             .filter(WhoopRecovery.created_at >= cutoff)
             .order_by(WhoopRecovery.created_at.desc())
             .limit(14)
@@ -257,7 +406,9 @@ def build_qa_context(question: str, days: int = 14) -> str:
         ]
         journals = [
             {"date": str(j.date), "alcohol": j.alcohol_units, "stress": j.stress_level, "late_caffeine": j.late_caffeine}
-            for j in db.query(JournalEntry)
+            for j in db.query(
+                JournalEntry.date, JournalEntry.alcohol_units, JournalEntry.stress_level, JournalEntry.late_caffeine,
+            )
             .filter(JournalEntry.date >= cutoff.date())
             .order_by(JournalEntry.date.desc())
             .limit(14)
@@ -269,15 +420,15 @@ def build_qa_context(question: str, days: int = 14) -> str:
         "",
         daily,
         "",
-        f"HRV TREND (date, ms): {[(r['date'], r['hrv']) for r in recoveries if r['hrv']]}",
-        f"RECOVERY TREND (date, score): {[(r['date'], r['score']) for r in recoveries if r['score']]}",
+        "HRV TREND (MM-DD:ms): " + ",".join(f"{r['date'][5:]}:{_fmt(r['hrv'])}" for r in recoveries if r["hrv"]),
+        "RECOVERY TREND (MM-DD:score): " + ",".join(f"{r['date'][5:]}:{r['score']}" for r in recoveries if r["score"]),
         "",
     ]
 
     if journals:
         lines.append("RECENT JOURNAL ENTRIES:")
         for j in journals:
-            lines.append(f"  {j['date']}: alcohol={j['alcohol']}, stress={j['stress']}/5, late_caffeine={j['late_caffeine']}")
+            lines.append(f"  {j['date'][5:]}: alcohol={j['alcohol']} stress={j['stress']}/5 late_caffeine={j['late_caffeine']}")
 
     lines.append(f"\nUSER QUESTION: {question}")
     return "\n".join(lines)
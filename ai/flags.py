@@ -4,11 +4,16 @@ All ORM data extracted to plain values inside session to avoid DetachedInstanceE
 """
 
 import logging
+from concurrent.futures import ThreadPoolExecutor
 from dataclasses import dataclass
 from datetime import datetime, timedelta, timezone
-from statistics import mean
 
-from db.database import get_db
+import numpy as np
+from sqlalchemy import Row, and_, func, select
+
+from ai._cache import ttl_cache
+from ai._kernels import skin_temp_delta
+from db.database import get_db, use_db
 from db.models import WhoopRecovery, WhoopSleep, WhoopCycle
 from config.settings import (
     HRV_DROP_THRESHOLD_PCT,
@@ -23,6 +28,8 @@ from config.settings import (
 
 logger = logging.getLogger(__name__)
 
+_last_run: tuple[tuple, list] | None = None    # (watermark key, flags) from the last full run
+
 
 @dataclass
 class Flag:
@@ -32,28 +39,109 @@ class Flag:
     data: dict
 
 
-def _get_recent_recoveries(days: int) -> list[dict]:
-    cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+@dataclass(slots=True)
+class RecoverySoA:
+    """Recent recoveries as parallel float64 columns, newest first. Missing values are NaN."""
+    hrv: np.ndarray
+    score: np.ndarray
+    skin_temp: np.ndarray
+    created_at: np.ndarray      # epoch seconds
+
+    def since(self, cutoff: datetime) -> "RecoverySoA":
+        mask = self.created_at >= cutoff.timestamp()
+        return RecoverySoA(self.hrv[mask], self.score[mask], self.skin_temp[mask], self.created_at[mask])
+
+
+# Keyed on now's date rather than the instant, so calls within a day share the entry
+@ttl_cache(key=lambda days, limit, now: (days, limit, now.date()))
+def _get_recent_recoveries(days: int, limit: int, now: datetime) -> RecoverySoA:
+    """At most `limit` rows — one recovery per cycle means roughly one per day."""
+    cutoff = now - timedelta(days=days)
     with get_db() as db:
-        return [
-            {"hrv": r.hrv_rmssd_milli, "score": r.recovery_score, "skin_temp": r.skin_temp_celsius}
-            for r in db.query(WhoopRecovery)
-            .filter(WhoopRecovery.created_at >= cutoff)
+        rows = db.execute(
+            select(
+                WhoopRecovery.hrv_rmssd_milli.label("hrv"),
+                WhoopRecovery.recovery_score.label("score"),
+                WhoopRecovery.skin_temp_celsius.label("skin_temp"),
+                WhoopRecovery.created_at,
+            )
+            .where(WhoopRecovery.created_at >= cutoff)
             .order_by(WhoopRecovery.created_at.desc())
-            .all()
-        ]
+            .limit(limit)
+        ).all()
+    n = len(rows)
+    return RecoverySoA(
+        hrv=np.fromiter((r.hrv for r in rows), dtype=np.float64, count=n),
+        score=np.fromiter((r.score for r in rows), dtype=np.float64, count=n),
+        skin_temp=np.fromiter((r.skin_temp for r in rows), dtype=np.float64, count=n),
+        created_at=np.fromiter((r.created_at.timestamp() for r in rows), dtype=np.float64, count=n),
+    )
+
+
+def _get_recent_sleep_debts(days: int, now: datetime) -> list[int]:
+    cutoff = now - timedelta(days=days)
+    with get_db() as db:
+        return db.scalars(
+            select(WhoopSleep.sleep_debt_milli)
+            .where(WhoopSleep.end >= cutoff)
+            .where(WhoopSleep.sleep_debt_milli.isnot(None))
+            .order_by(WhoopSleep.end.desc())
+            .limit(1)   # only the latest debt is checked
+        ).all()
+
+
+def _get_strain_overload_stats(days: int, limit: int, now: datetime) -> Row:
+    """
+    (days, overloaded, avg_strain, avg_recovery) over the latest `limit` cycles in
+    the window, each paired with its own recovery via cycle_id — counted in SQL.
+    """
+    cutoff = now - timedelta(days=days)
+    recent = (
+        select(WhoopCycle.strain_score.label("strain"), WhoopRecovery.recovery_score.label("score"))
+        .join(WhoopRecovery, WhoopRecovery.cycle_id == WhoopCycle.id)
+        .where(WhoopCycle.start >= cutoff)
+        .where(WhoopCycle.strain_score.isnot(None))
+        .where(WhoopRecovery.recovery_score.isnot(None))
+        .order_by(WhoopCycle.start.desc())
+        .limit(limit)
+        .subquery()
+    )
+    with get_db() as db:
+        return db.execute(
+            select(
+                func.count().label("days"),
+                func.count().filter(and_(recent.c.strain >= 14, recent.c.score < 67)).label("overloaded"),
+                func.avg(recent.c.strain).label("avg_strain"),
+                func.avg(recent.c.score).label("avg_recovery"),
+            )
+        ).one()
+
+
+def _data_watermark(db=None) -> tuple:
+    """Latest row timestamp per source table, in one round-trip."""
+    with use_db(db) as db:
+        return tuple(db.execute(
+            select(
+                select(func.max(WhoopRecovery.created_at)).scalar_subquery(),
+                select(func.max(WhoopSleep.end)).scalar_subquery(),
+                select(func.max(WhoopCycle.start)).scalar_subquery(),
+            )
+        ).one())
+
 
+def _present(values: np.ndarray) -> np.ndarray:
+    return values[np.isfinite(values)]
 
-def check_hrv_drop(hrv_baseline: float | None) -> Flag | None:
+
+def check_hrv_drop(hrv_baseline: float | None, recoveries: RecoverySoA) -> Flag | None:
     if not hrv_baseline:
         return None
-    rows = _get_recent_recoveries(HRV_DROP_CONSECUTIVE_DAYS + 2)
-    recent = [r for r in rows if r["hrv"] is not None][:HRV_DROP_CONSECUTIVE_DAYS]
+    recent = _present(recoveries.hrv)[:HRV_DROP_CONSECUTIVE_DAYS]
     if len(recent) < HRV_DROP_CONSECUTIVE_DAYS:
         return None
     threshold = hrv_baseline * (1 - HRV_DROP_THRESHOLD_PCT)
-    if all(r["hrv"] < threshold for r in recent):
-        avg = round(mean(r["hrv"] for r in recent), 1)
+    if (recent < threshold).all():
+        avg = round(float(recent.mean()), 1)
         drop_pct = round((hrv_baseline - avg) / hrv_baseline * 100, 1)
         return Flag(
             key="hrv_drop", severity="alert",
@@ -65,13 +153,12 @@ def check_hrv_drop(hrv_baseline: float | None) -> Flag | None:
     return None
 
 
-def check_low_recovery() -> Flag | None:
-    rows = _get_recent_recoveries(LOW_RECOVERY_CONSECUTIVE_DAYS + 2)
-    recent = [r for r in rows if r["score"] is not None][:LOW_RECOVERY_CONSECUTIVE_DAYS]
+def check_low_recovery(recoveries: RecoverySoA) -> Flag | None:
+    recent = _present(recoveries.score)[:LOW_RECOVERY_CONSECUTIVE_DAYS]
     if len(recent) < LOW_RECOVERY_CONSECUTIVE_DAYS:
         return None
-    if all(r["score"] < LOW_RECOVERY_THRESHOLD for r in recent):
-        scores = [r["score"] for r in recent]
+    if (recent < LOW_RECOVERY_THRESHOLD).all():
+        scores = [int(s) for s in recent]
         return Flag(
             key="low_recovery", severity="alert",
             message=(f"Recovery has been in the red zone (<{LOW_RECOVERY_THRESHOLD}%) "
@@ -82,76 +169,43 @@ def check_low_recovery() -> Flag | None:
     return None
 
 
-def check_sleep_debt() -> Flag | None:
-    cutoff = datetime.now(timezone.utc) - timedelta(days=SLEEP_DEBT_WINDOW_DAYS)
-    with get_db() as db:
-        debts = [
-            s.sleep_debt_milli for s in
-            db.query(WhoopSleep)
-            .filter(WhoopSleep.end >= cutoff)
-            .filter(WhoopSleep.sleep_debt_milli.isnot(None))
-            .order_by(WhoopSleep.end.desc())
-            .all()
-        ]
+def check_sleep_debt(debts: list[int]) -> Flag | None:
     if not debts:
         return None
     latest_debt_h = debts[0] / 3_600_000
     if latest_debt_h > SLEEP_DEBT_THRESHOLD_HOURS:
+        debt_h = round(latest_debt_h, 1)
         return Flag(
             key="sleep_debt", severity="warn",
-            message=(f"Sleep debt is {round(latest_debt_h, 1)}h — above your {SLEEP_DEBT_THRESHOLD_HOURS}h threshold. "
+            message=(f"Sleep debt is {debt_h}h — above your {SLEEP_DEBT_THRESHOLD_HOURS}h threshold. "
                      "Aim for an earlier bedtime tonight."),
-            data={"debt_hours": round(latest_debt_h, 1)},
+            data={"debt_hours": debt_h},
         )
     return None
 
 
-def check_skin_temp_spike() -> Flag | None:
-    rows = _get_recent_recoveries(14)
-    temps = [r["skin_temp"] for r in rows if r["skin_temp"] is not None]
+def check_skin_temp_spike(recoveries: RecoverySoA) -> Flag | None:
+    temps = _present(recoveries.skin_temp)
     if len(temps) < 5:
         return None
-    baseline = mean(temps[1:])
-    latest = temps[0]
-    delta = latest - baseline
+    delta, baseline, latest = skin_temp_delta(temps)
     if delta > SKIN_TEMP_SPIKE_C:
+        data = {"latest": round(latest, 2), "baseline": round(baseline, 2), "delta": round(delta, 2)}
         return Flag(
             key="skin_temp", severity="alert",
-            message=(f"Skin temp spiked +{round(delta, 2)}°C above your recent baseline "
-                     f"({round(latest, 2)}°C vs {round(baseline, 2)}°C avg). Possible early illness signal."),
-            data={"latest": round(latest, 2), "baseline": round(baseline, 2), "delta": round(delta, 2)},
+            message=("Skin temp spiked +{delta}°C above your recent baseline "
+                     "({latest}°C vs {baseline}°C avg). Possible early illness signal.").format_map(data),
+            data=data,
         )
     return None
 
 
-def check_strain_overload() -> Flag | None:
-    cutoff = datetime.now(timezone.utc) - timedelta(days=STRAIN_OVERLOAD_DAYS)
-    with get_db() as db:
-        cycles = [
-            {"strain": c.strain_score}
-            for c in db.query(WhoopCycle)
-            .filter(WhoopCycle.start >= cutoff)
-            .filter(WhoopCycle.strain_score.isnot(None))
-            .order_by(WhoopCycle.start.desc())
-            .all()
-        ]
-        recoveries = [
-            {"score": r.recovery_score}
-            for r in db.query(WhoopRecovery)
-            .filter(WhoopRecovery.created_at >= cutoff)
-            .filter(WhoopRecovery.recovery_score.isnot(None))
-            .order_by(WhoopRecovery.created_at.desc())
-            .all()
-        ]
-    if len(cycles) < STRAIN_OVERLOAD_DAYS or len(recoveries) < STRAIN_OVERLOAD_DAYS:
+def check_strain_overload(stats: Row) -> Flag | None:
+    if stats.days < STRAIN_OVERLOAD_DAYS:
         return None
-    overloaded_days = sum(
-        1 for c, r in zip(cycles[:STRAIN_OVERLOAD_DAYS], recoveries[:STRAIN_OVERLOAD_DAYS])
-        if (c["strain"] or 0) >= 14 and (r["score"] or 100) < 67
-    )
-    if overloaded_days >= STRAIN_OVERLOAD_DAYS:
-        avg_strain = round(mean(c["strain"] for c in cycles[:STRAIN_OVERLOAD_DAYS] if c["strain"]), 1)
-        avg_rec = round(mean(r["score"] for r in recoveries[:STRAIN_OVERLOAD_DAYS] if r["score"]), 1)
+    if stats.overloaded >= STRAIN_OVERLOAD_DAYS:
+        avg_strain = round(float(stats.avg_strain), 1)
+        avg_rec = round(float(stats.avg_recovery), 1)
         return Flag(
             key="strain_overload", severity="alert",
             message=(f"High strain (avg {avg_strain}) has outpaced recovery (avg {avg_rec}%) "
@@ -161,20 +215,51 @@ def check_strain_overload() -> Flag | None:
     return None
 
 
-def run_all_checks(hrv_baseline: float | None = None) -> list[Flag]:
+def run_all_checks(hrv_baseline: float | None = None, now: datetime | None = None, db=None) -> list[Flag]:
+    """
+    The three independent fetches run concurrently, each on its own session. Recoveries
+    are fetched once for the widest window any check needs; each check gets its slice.
+    A failed fetch surfaces as a failed check, same as any other checker error.
+    Every cutoff derives from one `now` (defaults to the current time). `db` is only used
+    for the watermark probe — the fetches run in worker threads and can't share it.
+    Results are memoised on the data watermark only; callers get their own list copy.
+    """
+    global _last_run
+    now = now or datetime.now(timezone.utc)
+
+    # Nothing new synced since the last run (same day, same baseline) → same flags.
+    # Short-circuits repeat triggers, including the common no-data-yet case.
+    try:
+        key = (_data_watermark(db), hrv_baseline, now.date())
+    except Exception as e:
+        logger.warning(f"Flag watermark query failed: {e}")
+        key = None
+    if key is not None and _last_run is not None and _last_run[0] == key:
+        return list(_last_run[1])
+
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        widest = max(HRV_DROP_CONSECUTIVE_DAYS + 2, LOW_RECOVERY_CONSECUTIVE_DAYS + 2, 14)
+        recoveries = pool.submit(_get_recent_recoveries, widest, widest, now)
+        debts = pool.submit(_get_recent_sleep_debts, SLEEP_DEBT_WINDOW_DAYS, now)
+        strain = pool.submit(_get_strain_overload_stats, STRAIN_OVERLOAD_DAYS, STRAIN_OVERLOAD_DAYS, now)
+
     checkers = [
-        lambda: check_hrv_drop(hrv_baseline),
-        check_low_recovery,
-        check_sleep_debt,
-        check_skin_temp_spike,
-        check_strain_overload,
+        lambda: check_hrv_drop(hrv_baseline, recoveries.result().since(now - timedelta(days=HRV_DROP_CONSECUTIVE_DAYS + 2))),
+        lambda: check_low_recovery(recoveries.result().since(now - timedelta(days=LOW_RECOVERY_CONSECUTIVE_DAYS + 2))),
+        lambda: check_sleep_debt(debts.result()),
+        lambda: check_skin_temp_spike(recoveries.result().since(now - timedelta(days=14))),
+        lambda: check_strain_overload(strain.result()),
     ]
     flags = []
+    failed = False
     for checker in checkers:
         try:
             flag = checker()
             if flag:
                 flags.append(flag)
         except Exception as e:
+            failed = True
             logger.warning(f"Flag check failed: {e}")
+    if key is not None and not failed:   # never remember a partial result
+        _last_run = (key, list(flags))
     return flags
@@ -1,4 +1,14 @@
-"""Reusable prompt templates for Claude API calls."""
+"""
+Reusable prompt templates for Gemini calls.
+Static instructions always lead the prompt, ahead of the per-day data, so
+the repeated prefix is eligible for Gemini's implicit context caching.
+"""
+
+DAILY_INSIGHT_PROMPT = (
+    "Based on today's data, give Jay one sharp observation and one concrete action for today. "
+    "Max 2 sentences. Lead with the most important signal. Skip anything obvious. "
+    "No fluff, no 'your recovery is X%' restatements — he can already see the numbers."
+)
 
 MORNING_SUMMARY_PROMPT = """
 Based on Jay's biometric data, write a concise morning health summary for Slack.
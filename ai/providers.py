@@ -0,0 +1,90 @@
+"""
+LLM provider layer — the analyzer talks to a provider, not to an SDK.
+Caching, rate limiting, alerting and insight persistence stay in ai/analyzer.py,
+so they apply regardless of which provider is configured via LLM_PROVIDER.
+"""
+
+from functools import lru_cache
+from typing import TYPE_CHECKING, Protocol
+
+from config.settings import GEMINI_API_KEY, LLM_PROVIDER
+
+if TYPE_CHECKING:
+    import google.generativeai as genai
+
+
+class LLMProvider(Protocol):
+    name: str
+
+    async def generate(self, model_name: str, system: str, prompt: str, max_tokens: int) -> str:
+        ...
+
+
+@lru_cache(maxsize=1)
+def _genai():
+    """
+    Import and configure the SDK on first use — it pulls in gRPC and protobufs,
+    which slash commands and jobs that never call Gemini shouldn't pay for.
+    The SDK's async client speaks gRPC over one HTTP/2 channel that it caches for
+    the life of the process, so every call reuses the same keep-alive connection.
+    Don't pass transport="rest" here — the async client doesn't support it.
+    """
+    import google.generativeai as genai
+
+    genai.configure(api_key=GEMINI_API_KEY)
+    return genai
+
+
+@lru_cache(maxsize=32)
+def _get_model(model_name: str, system: str) -> "genai.GenerativeModel":
+    return _genai().GenerativeModel(model_name=model_name, system_instruction=system)
+
+
+# Candidate finish reasons that mean the output was withheld rather than completed
+_BLOCKED_FINISH_REASONS = {"SAFETY", "RECITATION", "BLOCKLIST", "PROHIBITED_CONTENT", "SPII"}
+
+
+class GeminiProvider:
+    name = "Gemini"
+
+    async def generate(self, model_name: str, system: str, prompt: str, max_tokens: int) -> str:
+        model = _get_model(model_name, system)
+        # Stream so tokens are consumed as they arrive rather than after the full completion
+        response = await model.generate_content_async(
+            prompt,
+            generation_config=_genai().GenerationConfig(max_output_tokens=max_tokens),
+            stream=True,
+        )
+        buf = []
+        finish_reason = None
+        async for chunk in response:
+            if chunk.parts:
+                buf.append(chunk.text)
+            if chunk.candidates:
+                finish_reason = chunk.candidates[0].finish_reason
+
+        # A blocked or empty stream yields no parts — fail like response.text would, so the
+        # caller alerts instead of caching and persisting an empty insight
+        feedback = response.prompt_feedback
+        block_reason = getattr(feedback, "block_reason", None) if feedback else None
+        if block_reason:
+            raise RuntimeError(f"Gemini blocked the prompt: {getattr(block_reason, 'name', block_reason)}")
+        finish_name = getattr(finish_reason, "name", finish_reason)
+        if finish_name in _BLOCKED_FINISH_REASONS:
+            raise RuntimeError(f"Gemini stopped the response: {finish_name}")
+        if not buf:
+            raise RuntimeError(f"Gemini returned no content (finish_reason: {finish_name})")
+        return "".join(buf)
+
+
+_PROVIDERS: dict[str, type] = {
+    "gemini": GeminiProvider,
+}
+
+
+@lru_cache(maxsize=1)
+def get_provider() -> LLMProvider:
+    try:
+        return _PROVIDERS[LLM_PROVIDER.lower()]()
+    except KeyError:
+        raise RuntimeError(f"Unknown LLM_PROVIDER: {LLM_PROVIDER!r} (expected one of: {', '.join(_PROVIDERS)})")
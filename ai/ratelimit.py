@@ -0,0 +1,71 @@
+"""
+Client-side limiter for Gemini calls — caps concurrent requests and requests per minute.
+Concurrency backs off AIMD-style: halved on a 429, grown back by one on each success.
+"""
+
+import asyncio
+import logging
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+
+logger = logging.getLogger(__name__)
+
+_WINDOW_SECONDS = 60
+
+
+def _is_throttled(exc: Exception) -> bool:
+    # google.api_core.exceptions.ResourceExhausted carries code == 429
+    return getattr(exc, "code", None) == 429
+
+
+class RateLimiter:
+    def __init__(self, rpm: int, max_concurrency: int):
+        self.rpm = rpm
+        self.max_concurrency = max_concurrency
+        self._limit = max_concurrency
+        self._active = 0
+        self._sent: deque[float] = deque()
+        self._cond = asyncio.Condition()
+
+    async def acquire(self):
+        async with self._cond:
+            while True:
+                now = time.monotonic()
+                while self._sent and now - self._sent[0] >= _WINDOW_SECONDS:
+                    self._sent.popleft()
+
+                window_full = len(self._sent) >= self.rpm
+                if self._active < self._limit and not window_full:
+                    self._active += 1
+                    self._sent.append(now)
+                    return
+
+                # Wake when a slot is released, or when the oldest request leaves the window
+                timeout = _WINDOW_SECONDS - (now - self._sent[0]) if window_full else None
+                try:
+                    await asyncio.wait_for(self._cond.wait(), timeout)
+                except asyncio.TimeoutError:
+                    pass
+
+    async def release(self, throttled: bool = False):
+        async with self._cond:
+            self._active -= 1
+            if throttled:
+                self._limit = max(1, self._limit // 2)
+                logger.warning(f"Gemini rate limited — concurrency reduced to {self._limit}")
+            elif self._limit < self.max_concurrency:
+                self._limit += 1
+            self._cond.notify_all()
+
+    @asynccontextmanager
+    async def slot(self):
+        await self.acquire()
+        throttled = False
+        try:
+            yield
+        except Exception as e:
+            throttled = _is_throttled(e)
+            raise
+        finally:
+            await self.release(throttled)
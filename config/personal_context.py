@@ -3,6 +3,8 @@ Jay's personal health profile — used to personalize every Claude prompt.
 Update baselines weekly or after Whoop recalibrates.
 """
 
+from functools import lru_cache
+
 PERSONAL_PROFILE = {
     "name": "Jay",
     "whoop_member_since": "2023",
@@ -42,12 +44,24 @@ PERSONAL_PROFILE = {
 }
 
 
+# Static sections of the prompt, joined once
+_GOALS_STR = "\n".join(f"- {g}" for g in PERSONAL_PROFILE["goals"])
+_SENSITIVITIES_STR = "\n".join(f"- {s}" for s in PERSONAL_PROFILE["sensitivities"])
+
+
 def get_system_prompt(hrv_baseline: float | None = None, rhr_baseline: float | None = None) -> str:
-    profile = PERSONAL_PROFILE.copy()
-    if hrv_baseline:
-        profile["hrv_baseline_ms"] = hrv_baseline
-    if rhr_baseline:
-        profile["rhr_baseline_bpm"] = rhr_baseline
+    # Whole-number baselines so 55.01 and 55.02 share a cache slot
+    return _build_system_prompt(
+        round(hrv_baseline) if hrv_baseline else None,
+        round(rhr_baseline) if rhr_baseline else None,
+    )
+
+
+@lru_cache(maxsize=32)
+def _build_system_prompt(hrv_baseline: int | None, rhr_baseline: int | None) -> str:
+    profile = PERSONAL_PROFILE
+    hrv_display = hrv_baseline or profile["hrv_baseline_ms"] or "not yet set"
+    rhr_display = rhr_baseline or profile["rhr_baseline_bpm"] or "not yet set"
 
     return f"""You are Jay's personal AI health companion powered by his Whoop biometric data.
 
@@ -55,14 +69,14 @@ ABOUT JAY:
 - Whoop member since {profile['whoop_member_since']}
 - Sleep target: {profile['sleep_target_hours']} hours/night
 - Typical schedule: bed {profile['typical_bedtime']}, wake {profile['typical_wake_time']}
-- HRV baseline: {profile['hrv_baseline_ms'] or 'not yet set'} ms (30-day rolling average)
-- RHR baseline: {profile['rhr_baseline_bpm'] or 'not yet set'} bpm
+- HRV baseline: {hrv_display} ms (30-day rolling average)
+- RHR baseline: {rhr_display} bpm
 
 GOALS:
-{chr(10).join(f'- {g}' for g in profile['goals'])}
+{_GOALS_STR}
 
 KNOWN SENSITIVITIES:
-{chr(10).join(f'- {s}' for s in profile['sensitivities'])}
+{_SENSITIVITIES_STR}
 
 NOTES:
 {profile['notes']}
@@ -1,7 +1,8 @@
 import os
+from pathlib import Path
 from dotenv import load_dotenv
 
-load_dotenv()
+load_dotenv()  # the one .env parse per process — other modules import from here
 
 # Whoop OAuth
 WHOOP_CLIENT_ID = os.getenv("WHOOP_CLIENT_ID", "")
@@ -23,6 +24,9 @@ GEMINI_API_KEY = os.getenv("GEMINI_API_KEY", "")
 # Database
 DATABASE_URL = os.getenv("DATABASE_URL", "postgresql://localhost/whoop_ai")
 
+# Whoop webhook receiver (whoop/webhook.py)
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8080"))
+
 # Dashboard
 DASHBOARD_URL = os.getenv("DASHBOARD_URL", "http://localhost:8501")
 
@@ -31,9 +35,19 @@ MORNING_HOUR = int(os.getenv("MORNING_HOUR", "8"))
 EVENING_JOURNAL_HOUR = int(os.getenv("EVENING_JOURNAL_HOUR", "21"))
 TIMEZONE = os.getenv("TIMEZONE", "America/New_York")
 
+# Local cache
+CACHE_DIR = Path(os.getenv("CACHE_DIR", "~/.cache/whoop_ai")).expanduser()
+LLM_CACHE_TTL = int(os.getenv("LLM_CACHE_TTL", "3600"))    # seconds; 0 disables
+AI_CACHE_TTL = int(os.getenv("AI_CACHE_TTL", "600"))       # baselines/flags/context; 0 disables
+
+# LLM provider (see ai/providers.py)
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini")
+
 # Gemini models
 GEMINI_ANALYSIS_MODEL = "gemini-3-flash-preview"    # Q&A + weekly reports
 GEMINI_SUMMARY_MODEL = "gemini-3-flash-preview"     # morning summaries + flag alerts
+GEMINI_RPM = int(os.getenv("GEMINI_RPM", "15"))
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
 
 # Flag thresholds
 HRV_DROP_THRESHOLD_PCT = 0.15
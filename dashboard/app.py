@@ -3,99 +3,183 @@ Streamlit dashboard — HRV, recovery, sleep, and workout trends.
 Run: streamlit run dashboard/app.py
 """
 
+import logging
+import os
+import pickle
 import sys
 from pathlib import Path
 sys.path.insert(0, str(Path(__file__).resolve().parents[1]))
 
-from datetime import datetime, timedelta, timezone
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, datetime, timedelta, timezone
 
+import numpy as np
 import pandas as pd
 import plotly.express as px
 import plotly.graph_objects as go
 import streamlit as st
-from dotenv import load_dotenv
-
-load_dotenv()
+from sqlalchemy import func, select
 
 from db.database import get_db
-from db.models import JournalEntry, WhoopRecovery, WhoopSleep, WhoopWorkout
-from ai.context import get_hrv_baseline, get_rhr_baseline
+from db.models import DailySummary, WhoopRecovery, WhoopWorkout
+from db.rollup import local_date
+from ai.context import get_baselines
+from config.settings import CACHE_DIR
 
 st.set_page_config(page_title="Whoop Dashboard", page_icon="💚", layout="wide")
 
+logger = logging.getLogger(__name__)
+
+_DISK_CACHE_DIR = CACHE_DIR / "dashboard"
+
 DAYS = st.sidebar.slider("Days to display", min_value=7, max_value=90, value=30)
 
 
-@st.cache_data(ttl=300)
-def load_data(days: int):
+def _read_daily(cutoff: datetime) -> pd.DataFrame:
+    with get_db() as db:
+        return pd.read_sql(
+            select(
+                DailySummary.date,
+                DailySummary.recovery_score.label("Recovery %"),
+                DailySummary.hrv_avg.label("HRV (ms)"),
+                DailySummary.rhr_avg.label("RHR (bpm)"),
+                DailySummary.total_in_bed_milli,
+                DailySummary.slow_wave_milli,
+                DailySummary.rem_sleep_milli,
+                DailySummary.light_sleep_milli,
+                DailySummary.alcohol_units,
+                DailySummary.stress_level,
+            )
+            .where(DailySummary.date >= cutoff.date())
+            .order_by(DailySummary.date),
+            db.connection(),
+        )
+
+
+def _read_workouts(cutoff: datetime) -> pd.DataFrame:
+    # Per-sport strain isn't in the rollup (it keeps one strain per day)
+    workout_day = local_date(WhoopWorkout.start).label("date")
+    with get_db() as db:
+        return pd.read_sql(
+            select(workout_day, WhoopWorkout.sport_name, func.sum(WhoopWorkout.strain_score).label("strain_score"))
+            .where(WhoopWorkout.start >= cutoff, WhoopWorkout.strain_score > 0)
+            .group_by(workout_day, WhoopWorkout.sport_name)
+            .order_by(workout_day),
+            db.connection(),
+        )
+
+
+def _read_latest(cutoff: datetime) -> dict | None:
+    with get_db() as db:
+        latest = db.execute(
+            select(
+                WhoopRecovery.recovery_score,
+                WhoopRecovery.hrv_rmssd_milli,
+                WhoopRecovery.resting_heart_rate,
+                WhoopRecovery.spo2_percentage,
+            )
+            .where(WhoopRecovery.created_at >= cutoff)
+            .order_by(WhoopRecovery.created_at.desc())
+            .limit(1)
+        ).first()
+    return latest._asdict() if latest else None
+
+
+def _build_data(days: int):
+    """Per-day chart series from the daily_summary rollup; workouts and the KPI row read raw rows."""
     cutoff = datetime.now(timezone.utc) - timedelta(days=days)
+
+    # Independent queries on separate pooled connections, so their round-trips overlap
+    with ThreadPoolExecutor(max_workers=3) as pool:
+        daily_f = pool.submit(_read_daily, cutoff)
+        wk_f = pool.submit(_read_workouts, cutoff)
+        latest_f = pool.submit(_read_latest, cutoff)
+    daily, wk_df, latest = daily_f.result(), wk_f.result(), latest_f.result()
+
+    rec_df = daily.loc[daily["Recovery %"].notna(), ["date", "Recovery %", "HRV (ms)", "RHR (bpm)"]]
+
+    slept = daily[daily["total_in_bed_milli"].notna()]
+    sleep_df = slept[["date"]].copy()
+    millis = slept[["total_in_bed_milli", "slow_wave_milli", "rem_sleep_milli", "light_sleep_milli"]]
+    sleep_df[["Total (h)", "Deep (h)", "REM (h)", "Light (h)"]] = (
+        millis.fillna(0).to_numpy(dtype=np.float64) / 3_600_000
+    ).round(2)
+
+    journal_df = daily.loc[daily["alcohol_units"].notna() | daily["stress_level"].notna(),
+                           ["date", "alcohol_units", "stress_level"]].fillna(0)
+
+    return latest, rec_df, sleep_df, wk_df, journal_df
+
+
+@st.cache_data(ttl=60)
+def data_watermark() -> str:
+    """Changes whenever the charts could: every sync and journal save rewrites daily_summary."""
     with get_db() as db:
-        recoveries = [
-            {
-                "date": r.created_at.date() if r.created_at else None,
-                "recovery_score": r.recovery_score,
-                "hrv_rmssd_milli": r.hrv_rmssd_milli,
-                "resting_heart_rate": r.resting_heart_rate,
-                "spo2_percentage": r.spo2_percentage,
-                "skin_temp_celsius": r.skin_temp_celsius,
-            }
-            for r in db.query(WhoopRecovery)
-            .filter(WhoopRecovery.created_at >= cutoff)
-            .order_by(WhoopRecovery.created_at)
-            .all()
-        ]
-        sleeps = [
-            {
-                "date": s.end.date() if s.end else None,
-                "total_in_bed_milli": s.total_in_bed_milli,
-                "slow_wave_milli": s.slow_wave_milli,
-                "rem_sleep_milli": s.rem_sleep_milli,
-                "light_sleep_milli": s.light_sleep_milli,
-                "sleep_performance_pct": s.sleep_performance_pct,
-                "sleep_debt_milli": s.sleep_debt_milli,
-                "nap": s.nap,
-            }
-            for s in db.query(WhoopSleep)
-            .filter(WhoopSleep.end >= cutoff)
-            .order_by(WhoopSleep.end)
-            .all()
-        ]
-        workouts = [
-            {
-                "date": w.start.date() if w.start else None,
-                "sport_name": w.sport_name,
-                "strain_score": w.strain_score,
-            }
-            for w in db.query(WhoopWorkout)
-            .filter(WhoopWorkout.start >= cutoff)
-            .order_by(WhoopWorkout.start)
-            .all()
-        ]
-        journals = [
-            {
-                "date": j.date,
-                "alcohol_units": j.alcohol_units or 0,
-                "stress_level": j.stress_level or 0,
-                "late_caffeine": int(j.late_caffeine or False),
-            }
-            for j in db.query(JournalEntry)
-            .filter(JournalEntry.date >= cutoff.date())
-            .order_by(JournalEntry.date)
-            .all()
-        ]
-    return recoveries, sleeps, workouts, journals
-
-
-recoveries, sleeps, workouts, journals = load_data(DAYS)
-hrv_baseline = get_hrv_baseline()
-rhr_baseline = get_rhr_baseline()
+        updated = db.execute(select(func.max(DailySummary.updated_at))).scalar()
+    # The window also slides at midnight
+    return f"{date.today()}|{updated}"
+
+
+@st.cache_data(max_entries=8)
+def load_data(days: int, watermark: str):
+    """
+    Chart data for the window, reused until new data lands. Persisted under CACHE_DIR so a
+    fresh Streamlit worker starts from disk instead of re-querying.
+    """
+    path = _DISK_CACHE_DIR / f"load_data_{days}.pkl"
+    try:
+        with path.open("rb") as f:
+            cached_watermark, data = pickle.load(f)
+        if cached_watermark == watermark:
+            return data
+    except FileNotFoundError:
+        pass
+    except Exception as e:
+        # Truncated, or pickled by another pandas/numpy version — rebuild and replace it
+        logger.warning(f"Discarding unreadable dashboard cache {path.name}: {e}")
+        try:
+            path.unlink(missing_ok=True)
+        except OSError:
+            pass
+
+    data = _build_data(days)
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        with tmp.open("wb") as f:
+            pickle.dump((watermark, data), f)
+        os.replace(tmp, path)
+    except OSError:
+        pass  # best-effort — the in-process cache still holds it
+    return data
+
+
+@st.cache_data(ttl=3600)
+def load_baselines():
+    """30-day baselines barely move within an hour — don't re-query them on every slider change."""
+    return get_baselines()
+
+
+def add_trendline(fig, x: pd.Series, y: pd.Series):
+    """Least-squares line via np.polyfit — plotly's trendline="ols" would pull in statsmodels."""
+    xs, ys = x.to_numpy(dtype=np.float64), y.to_numpy(dtype=np.float64)
+    mask = np.isfinite(xs) & np.isfinite(ys)
+    xs, ys = xs[mask], ys[mask]
+    if len(xs) <= 3 or np.ptp(xs) == 0:
+        return
+    slope, intercept = np.polyfit(xs, ys, 1)
+    ends = np.array([xs.min(), xs.max()])
+    fig.add_trace(go.Scatter(x=ends, y=slope * ends + intercept, mode="lines", name="Trend", showlegend=False))
+
+
+latest, rec_df, sleep_df, wk_df, journal_df = load_data(DAYS, data_watermark())
+hrv_baseline, rhr_baseline = load_baselines()
 
 st.title("💚 Whoop Health Dashboard")
 st.caption(f"Last {DAYS} days · HRV baseline: {hrv_baseline}ms · RHR baseline: {rhr_baseline}bpm")
 
 # ---- KPI row ----
-if recoveries:
-    latest = recoveries[-1]
+if latest:
     col1, col2, col3, col4 = st.columns(4)
     col1.metric("Recovery", f"{latest['recovery_score']}%")
     hrv = latest['hrv_rmssd_milli']
@@ -107,14 +191,7 @@ if recoveries:
 st.divider()
 
 # ---- Recovery + HRV ----
-if recoveries:
-    rec_df = pd.DataFrame([{
-        "date": r["date"],
-        "Recovery %": r["recovery_score"],
-        "HRV (ms)": r["hrv_rmssd_milli"],
-        "RHR (bpm)": r["resting_heart_rate"],
-    } for r in recoveries])
-
+if not rec_df.empty:
     col_left, col_right = st.columns(2)
 
     with col_left:
@@ -138,17 +215,7 @@ if recoveries:
         st.plotly_chart(fig, use_container_width=True)
 
 # ---- Sleep ----
-if sleeps:
-    sleep_df = pd.DataFrame([{
-        "date": s["date"],
-        "Total (h)": round((s["total_in_bed_milli"] or 0) / 3_600_000, 2),
-        "Deep (h)": round((s["slow_wave_milli"] or 0) / 3_600_000, 2),
-        "REM (h)": round((s["rem_sleep_milli"] or 0) / 3_600_000, 2),
-        "Light (h)": round((s["light_sleep_milli"] or 0) / 3_600_000, 2),
-        "Performance %": s["sleep_performance_pct"],
-        "Nap": s["nap"],
-    } for s in sleeps])
-
+if not sleep_df.empty:
     st.subheader("Sleep Breakdown")
     fig = px.bar(sleep_df, x="date", y=["Deep (h)", "REM (h)", "Light (h)"],
                  barmode="stack",
@@ -158,15 +225,14 @@ if sleeps:
     st.plotly_chart(fig, use_container_width=True)
 
 # ---- Journal correlations ----
-if journals and recoveries:
+if not journal_df.empty and not rec_df.empty:
     st.subheader("Journal × Recovery Correlations")
 
-    journal_df = pd.DataFrame(journals)
-    rec_df2 = pd.DataFrame([{
-        "date": r["date"],
-        "next_hrv": r["hrv_rmssd_milli"],
-        "next_recovery": r["recovery_score"],
-    } for r in recoveries])
+    # Key each recovery by the day before it, so a journal day pairs with the following morning
+    rec_df2 = rec_df[["date", "HRV (ms)", "Recovery %"]].rename(
+        columns={"HRV (ms)": "next_hrv", "Recovery %": "next_recovery"}
+    )
+    rec_df2["date"] = rec_df2["date"] - timedelta(days=1)
 
     merged = pd.merge(journal_df, rec_df2, on="date", how="inner")
     if not merged.empty:
@@ -174,22 +240,20 @@ if journals and recoveries:
         with col1:
             fig = px.scatter(merged, x="alcohol_units", y="next_hrv",
                              title="Alcohol → Next-day HRV",
-                             trendline="ols" if len(merged) > 3 else None,
                              labels={"alcohol_units": "Alcohol units", "next_hrv": "Next-day HRV (ms)"})
+            add_trendline(fig, merged["alcohol_units"], merged["next_hrv"])
             st.plotly_chart(fig, use_container_width=True)
         with col2:
             fig = px.scatter(merged, x="stress_level", y="next_recovery",
                              title="Stress → Next-day Recovery",
-                             trendline="ols" if len(merged) > 3 else None,
                              labels={"stress_level": "Stress (1-5)", "next_recovery": "Next-day Recovery %"})
+            add_trendline(fig, merged["stress_level"], merged["next_recovery"])
             st.plotly_chart(fig, use_container_width=True)
 
 # ---- Workouts ----
-if workouts:
-    wk_df = pd.DataFrame([w for w in workouts if w["strain_score"]])
-    if not wk_df.empty:
-        st.subheader("Workout Strain")
-        fig = px.bar(wk_df, x="date", y="strain_score", color="sport_name",
-                     labels={"strain_score": "Strain", "sport_name": "Sport"},
-                     height=250)
-        st.plotly_chart(fig, use_container_width=True)
+if not wk_df.empty:
+    st.subheader("Workout Strain")
+    fig = px.bar(wk_df, x="date", y="strain_score", color="sport_name",
+                 labels={"strain_score": "Strain", "sport_name": "Sport"},
+                 height=250)
+    st.plotly_chart(fig, use_container_width=True)
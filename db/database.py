@@ -4,7 +4,16 @@ from sqlalchemy.orm import sessionmaker, Session
 from config.settings import DATABASE_URL
 from db.models import Base
 
-engine = create_engine(DATABASE_URL, pool_pre_ping=True)
+# One engine per process (Streamlit reruns reuse the imported module, so the dashboard shares it too).
+# LIFO keeps the few hot connections warm; recycle before Supabase's pooler drops idle ones.
+engine = create_engine(
+    DATABASE_URL,
+    pool_pre_ping=True,
+    pool_size=5,
+    max_overflow=10,
+    pool_recycle=1800,
+    pool_use_lifo=True,
+)
 SessionLocal = sessionmaker(bind=engine, autocommit=False, autoflush=False)
 
 
@@ -24,3 +33,13 @@ def get_db() -> Session:
         raise
     finally:
         db.close()
+
+
+@contextmanager
+def use_db(db: Session | None = None) -> Session:
+    """Reuse the caller's session when given one; otherwise open a fresh one via get_db()."""
+    if db is not None:
+        yield db
+        return
+    with get_db() as db:
+        yield db
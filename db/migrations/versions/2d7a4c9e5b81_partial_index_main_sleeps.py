@@ -0,0 +1,31 @@
+"""partial index on sleep end for non-nap sleeps
+
+Revision ID: 2d7a4c9e5b81
+Revises: 8e5c1f4b9a23
+Create Date: 2026-10-15 17:26:04.331870
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '2d7a4c9e5b81'
+down_revision: Union[str, Sequence[str], None] = '8e5c1f4b9a23'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_sleep_end_main', 'whoop_sleep', ['end'], unique=False,
+        postgresql_where=sa.text('nap IS NOT true'),
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sleep_end_main', table_name='whoop_sleep')
@@ -0,0 +1,37 @@
+"""add covering indexes on recovery created_at and sleep end
+
+Revision ID: 3f1a9c2d7b84
+Revises: 6c83f25a3948
+Create Date: 2026-10-15 09:12:41.503217
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '3f1a9c2d7b84'
+down_revision: Union[str, Sequence[str], None] = '6c83f25a3948'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # Range scans return these columns straight from the index (a B-tree scans backwards
+    # for the latest-row lookups, so no separate DESC index is needed)
+    op.create_index(
+        'ix_recovery_created_covering', 'whoop_recovery', ['created_at'], unique=False,
+        postgresql_include=['hrv_rmssd_milli', 'resting_heart_rate', 'recovery_score', 'skin_temp_celsius'],
+    )
+    op.create_index(
+        'ix_sleep_end_covering', 'whoop_sleep', ['end'], unique=False,
+        postgresql_include=['sleep_debt_milli', 'total_in_bed_milli'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_sleep_end_covering', table_name='whoop_sleep')
+    op.drop_index('ix_recovery_created_covering', table_name='whoop_recovery')
@@ -0,0 +1,31 @@
+"""covering index for workout strain by day and sport
+
+Revision ID: 5a0d8e2b7c14
+Revises: e91b3c5a2f60
+Create Date: 2026-10-15 14:31:09.204557
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '5a0d8e2b7c14'
+down_revision: Union[str, Sequence[str], None] = 'e91b3c5a2f60'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    # The dashboard sums strain per (day, sport) — serve it from the index alone
+    op.create_index(
+        'ix_workout_start_covering', 'whoop_workouts', ['start'], unique=False,
+        postgresql_include=['sport_name', 'strain_score'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_workout_start_covering', table_name='whoop_workouts')
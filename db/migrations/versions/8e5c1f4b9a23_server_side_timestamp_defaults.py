@@ -0,0 +1,48 @@
+"""server-side now() defaults for timestamp columns
+
+Revision ID: 8e5c1f4b9a23
+Revises: f3b8d6e1a7c2
+Create Date: 2026-10-15 16:05:33.482190
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '8e5c1f4b9a23'
+down_revision: Union[str, Sequence[str], None] = 'f3b8d6e1a7c2'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_COLUMNS = (
+    ('whoop_cycles', 'synced_at'),
+    ('whoop_recovery', 'synced_at'),
+    ('whoop_sleep', 'synced_at'),
+    ('whoop_workouts', 'synced_at'),
+    ('journal_entries', 'created_at'),
+    ('daily_summary', 'updated_at'),
+    ('ai_insights', 'created_at'),
+    ('oauth_tokens', 'updated_at'),
+    ('oauth_tokens', 'created_at'),
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for table, column in _COLUMNS:
+        op.alter_column(
+            table, column,
+            existing_type=sa.DateTime(timezone=True), server_default=sa.text('now()'),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table, column in _COLUMNS:
+        op.alter_column(
+            table, column,
+            existing_type=sa.DateTime(timezone=True), server_default=None,
+        )
@@ -0,0 +1,30 @@
+"""covering index for range queries on cycle start
+
+Revision ID: b82e4d6f0a17
+Revises: 3f1a9c2d7b84
+Create Date: 2026-10-15 10:03:27.118402
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'b82e4d6f0a17'
+down_revision: Union[str, Sequence[str], None] = '3f1a9c2d7b84'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_index(
+        'ix_cycle_start_covering', 'whoop_cycles', ['start'], unique=False,
+        postgresql_include=['strain_score'],
+    )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_index('ix_cycle_start_covering', table_name='whoop_cycles')
@@ -0,0 +1,42 @@
+"""store sleep and workout duration millis as integer
+
+Revision ID: c6f2a91d0e38
+Revises: 5a0d8e2b7c14
+Create Date: 2026-10-15 15:12:48.630215
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'c6f2a91d0e38'
+down_revision: Union[str, Sequence[str], None] = '5a0d8e2b7c14'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_SLEEP_COLUMNS = (
+    'total_in_bed_milli', 'light_sleep_milli', 'slow_wave_milli', 'rem_sleep_milli', 'sleep_debt_milli',
+)
+_WORKOUT_COLUMNS = (
+    'zone_zero_milli', 'zone_one_milli', 'zone_two_milli',
+    'zone_three_milli', 'zone_four_milli', 'zone_five_milli',
+)
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    for column in _SLEEP_COLUMNS:
+        op.alter_column('whoop_sleep', column, existing_type=sa.BigInteger(), type_=sa.Integer())
+    for column in _WORKOUT_COLUMNS:
+        op.alter_column('whoop_workouts', column, existing_type=sa.BigInteger(), type_=sa.Integer())
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for column in _WORKOUT_COLUMNS:
+        op.alter_column('whoop_workouts', column, existing_type=sa.Integer(), type_=sa.BigInteger())
+    for column in _SLEEP_COLUMNS:
+        op.alter_column('whoop_sleep', column, existing_type=sa.Integer(), type_=sa.BigInteger())
@@ -0,0 +1,77 @@
+"""add daily_summary rollup table
+
+Revision ID: d4c7a1e93b5f
+Revises: b82e4d6f0a17
+Create Date: 2026-10-15 11:20:54.871306
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from config.settings import TIMEZONE
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'd4c7a1e93b5f'
+down_revision: Union[str, Sequence[str], None] = 'b82e4d6f0a17'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Fill the new table from the raw rows — baselines read only the rollup, and the scheduled
+# syncs only recompute their last 1-7 days. Same aggregation as db.rollup.refresh_daily_summary.
+_BACKFILL = sa.text("""
+    WITH rec AS (
+        SELECT CAST(timezone(:tz, created_at) AS date) AS d,
+               round(avg(hrv_rmssd_milli)::numeric, 2)::float8 AS hrv_avg,
+               round(avg(resting_heart_rate)::numeric, 2)::float8 AS rhr_avg,
+               round(avg(recovery_score)::numeric, 2)::float8 AS recovery_score,
+               round(avg(skin_temp_celsius)::numeric, 2)::float8 AS skin_temp
+        FROM whoop_recovery WHERE created_at IS NOT NULL GROUP BY 1
+    ), slp AS (
+        SELECT CAST(timezone(:tz, "end") AS date) AS d,
+               (array_agg(sleep_debt_milli ORDER BY "end" DESC)
+                   FILTER (WHERE sleep_debt_milli IS NOT NULL))[1] AS sleep_debt_milli,
+               sum(coalesce(total_in_bed_milli, 0)) AS total_in_bed_milli
+        FROM whoop_sleep WHERE "end" IS NOT NULL GROUP BY 1
+    ), cyc AS (
+        SELECT CAST(timezone(:tz, start) AS date) AS d,
+               round(max(strain_score)::numeric, 2)::float8 AS strain
+        FROM whoop_cycles WHERE start IS NOT NULL GROUP BY 1
+    ), days AS (
+        SELECT d FROM rec UNION SELECT d FROM slp UNION SELECT d FROM cyc
+    )
+    INSERT INTO daily_summary (
+        date, hrv_avg, rhr_avg, recovery_score, skin_temp,
+        sleep_debt_milli, total_in_bed_milli, strain, updated_at
+    )
+    SELECT days.d, rec.hrv_avg, rec.rhr_avg, rec.recovery_score, rec.skin_temp,
+           slp.sleep_debt_milli, slp.total_in_bed_milli, cyc.strain, now()
+    FROM days
+    LEFT JOIN rec USING (d)
+    LEFT JOIN slp USING (d)
+    LEFT JOIN cyc USING (d)
+""")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.create_table('daily_summary',
+    sa.Column('date', sa.Date(), nullable=False),
+    sa.Column('hrv_avg', sa.Float(), nullable=True),
+    sa.Column('rhr_avg', sa.Float(), nullable=True),
+    sa.Column('recovery_score', sa.Float(), nullable=True),
+    sa.Column('skin_temp', sa.Float(), nullable=True),
+    sa.Column('sleep_debt_milli', sa.BigInteger(), nullable=True),
+    sa.Column('total_in_bed_milli', sa.BigInteger(), nullable=True),
+    sa.Column('strain', sa.Float(), nullable=True),
+    sa.Column('updated_at', sa.DateTime(timezone=True), nullable=True),
+    sa.PrimaryKeyConstraint('date')
+    )
+    op.execute(_BACKFILL.bindparams(tz=TIMEZONE))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_table('daily_summary')
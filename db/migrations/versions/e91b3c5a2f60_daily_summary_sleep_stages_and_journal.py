@@ -0,0 +1,84 @@
+"""daily_summary sleep stages and journal columns
+
+Revision ID: e91b3c5a2f60
+Revises: d4c7a1e93b5f
+Create Date: 2026-10-15 14:02:37.518204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+from config.settings import TIMEZONE
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'e91b3c5a2f60'
+down_revision: Union[str, Sequence[str], None] = 'd4c7a1e93b5f'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# Rebuild every day from the raw rows: fills the new columns for all existing history
+# (syncs only recompute their last 1-7 days) and re-keys rows rolled up before days
+# were bucketed in TIMEZONE. Same aggregation as db.rollup.refresh_daily_summary.
+_REBUILD = sa.text("""
+    WITH rec AS (
+        SELECT CAST(timezone(:tz, created_at) AS date) AS d,
+               round(avg(hrv_rmssd_milli)::numeric, 2)::float8 AS hrv_avg,
+               round(avg(resting_heart_rate)::numeric, 2)::float8 AS rhr_avg,
+               round(avg(recovery_score)::numeric, 2)::float8 AS recovery_score,
+               round(avg(skin_temp_celsius)::numeric, 2)::float8 AS skin_temp
+        FROM whoop_recovery WHERE created_at IS NOT NULL GROUP BY 1
+    ), slp AS (
+        SELECT CAST(timezone(:tz, "end") AS date) AS d,
+               (array_agg(sleep_debt_milli ORDER BY "end" DESC)
+                   FILTER (WHERE sleep_debt_milli IS NOT NULL))[1] AS sleep_debt_milli,
+               sum(coalesce(total_in_bed_milli, 0)) AS total_in_bed_milli,
+               sum(coalesce(slow_wave_milli, 0)) AS slow_wave_milli,
+               sum(coalesce(rem_sleep_milli, 0)) AS rem_sleep_milli,
+               sum(coalesce(light_sleep_milli, 0)) AS light_sleep_milli
+        FROM whoop_sleep WHERE "end" IS NOT NULL GROUP BY 1
+    ), cyc AS (
+        SELECT CAST(timezone(:tz, start) AS date) AS d,
+               round(max(strain_score)::numeric, 2)::float8 AS strain
+        FROM whoop_cycles WHERE start IS NOT NULL GROUP BY 1
+    ), jrn AS (
+        SELECT date AS d, alcohol_units, stress_level FROM journal_entries
+    ), days AS (
+        SELECT d FROM rec UNION SELECT d FROM slp UNION SELECT d FROM cyc UNION SELECT d FROM jrn
+    )
+    INSERT INTO daily_summary (
+        date, hrv_avg, rhr_avg, recovery_score, skin_temp,
+        sleep_debt_milli, total_in_bed_milli, slow_wave_milli, rem_sleep_milli, light_sleep_milli,
+        strain, alcohol_units, stress_level, updated_at
+    )
+    SELECT days.d, rec.hrv_avg, rec.rhr_avg, rec.recovery_score, rec.skin_temp,
+           slp.sleep_debt_milli, slp.total_in_bed_milli, slp.slow_wave_milli, slp.rem_sleep_milli,
+           slp.light_sleep_milli, cyc.strain, jrn.alcohol_units, jrn.stress_level, now()
+    FROM days
+    LEFT JOIN rec USING (d)
+    LEFT JOIN slp USING (d)
+    LEFT JOIN cyc USING (d)
+    LEFT JOIN jrn USING (d)
+""")
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    op.add_column('daily_summary', sa.Column('slow_wave_milli', sa.BigInteger(), nullable=True))
+    op.add_column('daily_summary', sa.Column('rem_sleep_milli', sa.BigInteger(), nullable=True))
+    op.add_column('daily_summary', sa.Column('light_sleep_milli', sa.BigInteger(), nullable=True))
+    op.add_column('daily_summary', sa.Column('alcohol_units', sa.Integer(), nullable=True))
+    op.add_column('daily_summary', sa.Column('stress_level', sa.Integer(), nullable=True))
+    op.execute("DELETE FROM daily_summary")
+    op.execute(_REBUILD.bindparams(tz=TIMEZONE))
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    op.drop_column('daily_summary', 'stress_level')
+    op.drop_column('daily_summary', 'alcohol_units')
+    op.drop_column('daily_summary', 'light_sleep_milli')
+    op.drop_column('daily_summary', 'rem_sleep_milli')
+    op.drop_column('daily_summary', 'slow_wave_milli')
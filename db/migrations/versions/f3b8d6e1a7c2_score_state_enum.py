@@ -0,0 +1,47 @@
+"""score_state varchar to enum
+
+Revision ID: f3b8d6e1a7c2
+Revises: c6f2a91d0e38
+Create Date: 2026-10-15 15:40:21.017342
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = 'f3b8d6e1a7c2'
+down_revision: Union[str, Sequence[str], None] = 'c6f2a91d0e38'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+_TABLES = ('whoop_cycles', 'whoop_recovery', 'whoop_sleep', 'whoop_workouts')
+score_state = sa.Enum('SCORED', 'PENDING_SCORE', 'UNSCORABLE', name='score_state')
+
+
+def upgrade() -> None:
+    """Upgrade schema."""
+    score_state.create(op.get_bind(), checkfirst=True)
+    for table in _TABLES:
+        # Anything outside the vocabulary becomes NULL, matching what the sync now writes
+        op.alter_column(
+            table, 'score_state',
+            existing_type=sa.String(length=50), type_=score_state,
+            postgresql_using=(
+                "CASE WHEN score_state IN ('SCORED', 'PENDING_SCORE', 'UNSCORABLE') "
+                "THEN score_state::score_state END"
+            ),
+        )
+
+
+def downgrade() -> None:
+    """Downgrade schema."""
+    for table in _TABLES:
+        op.alter_column(
+            table, 'score_state',
+            existing_type=score_state, type_=sa.String(length=50),
+            postgresql_using='score_state::text',
+        )
+    score_state.drop(op.get_bind(), checkfirst=True)
@@ -1,7 +1,6 @@
-from datetime import datetime
 from sqlalchemy import (
     Column, Integer, BigInteger, String, Float, Boolean, Text,
-    DateTime, Date
+    DateTime, Date, Enum, Index, func,
 )
 from sqlalchemy.orm import DeclarativeBase
 
@@ -10,6 +9,11 @@ class Base(DeclarativeBase):
     pass
 
 
+# Whoop's fixed scoring vocabulary — a Postgres enum is 4 bytes vs a varchar per row
+SCORE_STATES = ("SCORED", "PENDING_SCORE", "UNSCORABLE")
+ScoreState = Enum(*SCORE_STATES, name="score_state")
+
+
 class WhoopCycle(Base):
     __tablename__ = "whoop_cycles"
 
@@ -21,8 +25,10 @@ class WhoopCycle(Base):
     kilojoules = Column(Float)
     avg_heart_rate = Column(Integer)
     max_heart_rate = Column(Integer)
-    score_state = Column(String(50))
-    synced_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    score_state = Column(ScoreState)
+    synced_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (Index("ix_cycle_start_covering", start, postgresql_include=["strain_score"]),)
 
 
 class WhoopRecovery(Base):
@@ -38,9 +44,18 @@ class WhoopRecovery(Base):
     resting_heart_rate = Column(Integer)
     spo2_percentage = Column(Float)
     skin_temp_celsius = Column(Float)
-    score_state = Column(String(50))
+    score_state = Column(ScoreState)
     created_at = Column(DateTime(timezone=True))
-    synced_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    synced_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    # Covering index: baselines, trends and flag checks are all a created_at range
+    # over these metrics, so they're answered from the index without heap fetches
+    __table_args__ = (
+        Index(
+            "ix_recovery_created_covering", created_at,
+            postgresql_include=["hrv_rmssd_milli", "resting_heart_rate", "recovery_score", "skin_temp_celsius"],
+        ),
+    )
 
 
 class WhoopSleep(Base):
@@ -52,19 +67,25 @@ class WhoopSleep(Base):
     nap = Column(Boolean)
     start = Column(DateTime(timezone=True))
     end = Column(DateTime(timezone=True))
-    total_in_bed_milli = Column(BigInteger)
-    light_sleep_milli = Column(BigInteger)
-    slow_wave_milli = Column(BigInteger)
-    rem_sleep_milli = Column(BigInteger)
+    total_in_bed_milli = Column(Integer)        # durations stay well under int32 max (~24.8 days of ms)
+    light_sleep_milli = Column(Integer)
+    slow_wave_milli = Column(Integer)
+    rem_sleep_milli = Column(Integer)
     awake_count = Column(Integer)               # disturbance_count
     sleep_cycle_count = Column(Integer)
     sleep_performance_pct = Column(Float)
     sleep_consistency_pct = Column(Float)
     sleep_efficiency_pct = Column(Float)
     respiratory_rate = Column(Float)
-    sleep_debt_milli = Column(BigInteger)       # from score.sleep_needed.need_from_sleep_debt_milli
-    score_state = Column(String(50))
-    synced_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    sleep_debt_milli = Column(Integer)          # from score.sleep_needed.need_from_sleep_debt_milli
+    score_state = Column(ScoreState)
+    synced_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_sleep_end_covering", end, postgresql_include=["sleep_debt_milli", "total_in_bed_milli"]),
+        # Main (non-nap) sleeps only — the morning message's latest-night lookup
+        Index("ix_sleep_end_main", end, postgresql_where=nap.isnot(True)),
+    )
 
 
 class WhoopWorkout(Base):
@@ -81,14 +102,18 @@ class WhoopWorkout(Base):
     max_heart_rate = Column(Integer)
     kilojoules = Column(Float)
     distance_meter = Column(Float)
-    zone_zero_milli = Column(BigInteger)
-    zone_one_milli = Column(BigInteger)
-    zone_two_milli = Column(BigInteger)
-    zone_three_milli = Column(BigInteger)
-    zone_four_milli = Column(BigInteger)
-    zone_five_milli = Column(BigInteger)
-    score_state = Column(String(50))
-    synced_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    zone_zero_milli = Column(Integer)
+    zone_one_milli = Column(Integer)
+    zone_two_milli = Column(Integer)
+    zone_three_milli = Column(Integer)
+    zone_four_milli = Column(Integer)
+    zone_five_milli = Column(Integer)
+    score_state = Column(ScoreState)
+    synced_at = Column(DateTime(timezone=True), server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_workout_start_covering", start, postgresql_include=["sport_name", "strain_score"]),
+    )
 
 
 class JournalEntry(Base):
@@ -101,7 +126,27 @@ class JournalEntry(Base):
     caffeine = Column(Boolean)
     late_caffeine = Column(Boolean)             # after 2pm
     notes = Column(Text)
-    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
+
+
+class DailySummary(Base):
+    """One row per calendar day, rolled up from the raw Whoop tables at sync time (db/rollup.py)."""
+    __tablename__ = "daily_summary"
+
+    date = Column(Date, primary_key=True)
+    hrv_avg = Column(Float)
+    rhr_avg = Column(Float)
+    recovery_score = Column(Float)
+    skin_temp = Column(Float)
+    sleep_debt_milli = Column(BigInteger)       # latest sleep ending that day
+    total_in_bed_milli = Column(BigInteger)     # summed across sleeps ending that day
+    slow_wave_milli = Column(BigInteger)        # stage totals summed the same way
+    rem_sleep_milli = Column(BigInteger)
+    light_sleep_milli = Column(BigInteger)
+    strain = Column(Float)
+    alcohol_units = Column(Integer)             # from that day's journal entry
+    stress_level = Column(Integer)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
 class AIInsight(Base):
@@ -112,7 +157,7 @@ class AIInsight(Base):
     content = Column(Text, nullable=False)
     data_window_start = Column(DateTime(timezone=True))
     data_window_end = Column(DateTime(timezone=True))
-    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
 class OAuthToken(Base):
@@ -125,7 +170,7 @@ class OAuthToken(Base):
     expires_at = Column(DateTime(timezone=True), nullable=True)
     scope = Column(Text, nullable=True)
     token_type = Column(String(50), nullable=True)
-    updated_at = Column(DateTime(timezone=True), default=datetime.utcnow, onupdate=datetime.utcnow)
-    created_at = Column(DateTime(timezone=True), default=datetime.utcnow)
+    updated_at = Column(DateTime(timezone=True), server_default=func.now(), onupdate=func.now())
+    created_at = Column(DateTime(timezone=True), server_default=func.now())
 
 
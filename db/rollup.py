@@ -0,0 +1,119 @@
+"""
+Roll raw Whoop rows up into daily_summary — one row per calendar day.
+Runs at the end of every sync and after each journal save; baselines and the dashboard
+read the rollup instead of scanning raw rows.
+
+Usage:
+    python3 -m db.rollup              # rebuild the last 90 days
+    python3 -m db.rollup --days 365   # rebuild the last N days
+"""
+
+import argparse
+import logging
+from datetime import date, datetime, time, timedelta, timezone
+from zoneinfo import ZoneInfo
+
+from sqlalchemy import Date, cast, func, select
+from sqlalchemy.dialects.postgresql import insert
+from sqlalchemy.orm import Session
+
+from config.settings import TIMEZONE
+from db.models import DailySummary, JournalEntry, WhoopCycle, WhoopRecovery, WhoopSleep
+
+logger = logging.getLogger(__name__)
+
+_COLUMNS = (
+    "hrv_avg", "rhr_avg", "recovery_score", "skin_temp",
+    "sleep_debt_milli", "total_in_bed_milli", "slow_wave_milli", "rem_sleep_milli", "light_sleep_milli",
+    "strain", "alcohol_units", "stress_level",
+)
+_SLEEP_TOTALS = ("total_in_bed_milli", "slow_wave_milli", "rem_sleep_milli", "light_sleep_milli")
+
+
+def local_date(column):
+    """Calendar day of a timestamptz in TIMEZONE — a 10pm workout in New York is that day's, not tomorrow's UTC."""
+    return cast(func.timezone(TIMEZONE, column), Date)
+
+
+def refresh_daily_summary(db: Session, since: date) -> int:
+    """Recompute and upsert daily_summary rows for every day from `since` on. Returns rows written."""
+    days: dict[date, dict] = {}
+    # Filter on the raw timestamp (indexed) from local midnight; group on its local date
+    since_ts = datetime.combine(since, time.min, tzinfo=ZoneInfo(TIMEZONE))
+
+    rec_day = local_date(WhoopRecovery.created_at)
+    for d, hrv, rhr, score, skin in db.execute(
+        select(
+            rec_day,
+            func.avg(WhoopRecovery.hrv_rmssd_milli),
+            func.avg(WhoopRecovery.resting_heart_rate),
+            func.avg(WhoopRecovery.recovery_score),
+            func.avg(WhoopRecovery.skin_temp_celsius),
+        )
+        .where(WhoopRecovery.created_at >= since_ts)
+        .group_by(rec_day)
+    ):
+        days.setdefault(d, {}).update(
+            hrv_avg=_float(hrv), rhr_avg=_float(rhr), recovery_score=_float(score), skin_temp=_float(skin),
+        )
+
+    sleep_day = local_date(WhoopSleep.end)
+    # Ordered by end so the debt kept per day is the one from its last sleep
+    for d, debt, *totals in db.execute(
+        select(sleep_day, WhoopSleep.sleep_debt_milli, *(getattr(WhoopSleep, col) for col in _SLEEP_TOTALS))
+        .where(WhoopSleep.end >= since_ts)
+        .order_by(WhoopSleep.end)
+    ):
+        day = days.setdefault(d, {})
+        for col, value in zip(_SLEEP_TOTALS, totals):
+            day[col] = day.get(col, 0) + (value or 0)
+        if debt is not None:
+            day["sleep_debt_milli"] = debt
+
+    cycle_day = local_date(WhoopCycle.start)
+    for d, strain in db.execute(
+        select(cycle_day, func.max(WhoopCycle.strain_score))
+        .where(WhoopCycle.start >= since_ts)
+        .group_by(cycle_day)
+    ):
+        days.setdefault(d, {})["strain"] = _float(strain)
+
+    for d, alcohol, stress in db.execute(
+        select(JournalEntry.date, JournalEntry.alcohol_units, JournalEntry.stress_level)
+        .where(JournalEntry.date >= since)
+    ):
+        days.setdefault(d, {}).update(alcohol_units=alcohol, stress_level=stress)
+
+    if not days:
+        return 0
+
+    # Every column is written for every day — a day with no sleep/cycle/journal rows gets NULLs
+    now = datetime.now(timezone.utc)
+    rows = [{**dict.fromkeys(_COLUMNS), **values, "date": d, "updated_at": now} for d, values in days.items()]
+    stmt = insert(DailySummary)
+    db.execute(
+        stmt.on_conflict_do_update(
+            index_elements=[DailySummary.date],
+            set_={col: stmt.excluded[col] for col in (*_COLUMNS, "updated_at")},
+        ),
+        rows,
+    )
+    return len(rows)
+
+
+def _float(value) -> float | None:
+    return round(float(value), 2) if value is not None else None
+
+
+if __name__ == "__main__":
+    import sys
+    from db.database import get_db
+
+    logging.basicConfig(level=logging.INFO, stream=sys.stdout)
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=90)
+    args = parser.parse_args()
+
+    with get_db() as db:
+        n = refresh_daily_summary(db, since=date.today() - timedelta(days=args.days))
+    logger.info(f"daily_summary refreshed — {n} day(s)")
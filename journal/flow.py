@@ -7,9 +7,12 @@ import logging
 import re
 from datetime import date
 
+from ai.context import clear_context_cache
 from db.database import get_db
 from db.models import JournalEntry
+from db.rollup import refresh_daily_summary
 from config.settings import SLACK_USER_ID
+from slack_bot.journal_registry import register_journal_thread, unregister_journal_thread
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +24,17 @@ JOURNAL_PROMPT = """\
 3. Late caffeine after 2pm? (y/n)
 4. Anything else? (optional)"""
 
+_ALCOHOL_NONE_RE = re.compile(r"\bnone\b|0\b|no\b", re.IGNORECASE)
+_ALCOHOL_NUM_RE = re.compile(r"(\d+)")
+_ALCOHOL_FEW_RE = re.compile(r"1-2|one|two", re.IGNORECASE)
+_ALCOHOL_MANY_RE = re.compile(r"3\+|three|few", re.IGNORECASE)
+_STRESS_RE = re.compile(r"\b([1-5])\b")
+_YES_RE = re.compile(r"\by(es)?\b|yeah|yep|true", re.IGNORECASE)
+_NO_RE = re.compile(r"\bno?\b|nope|nah|false", re.IGNORECASE)
+_LEADING_NUM_RE = re.compile(r"^\d+[\.\)]\s*")
+# The prompt's own numbering ("1. ", "2) ", ...) — stripped by slicing, no regex needed
+_PREFIXES = tuple(f"{n}{sep} " for n in "12345" for sep in ".)")
+
 
 async def send_journal_prompt(client) -> str | None:
     """Post the journal prompt and register the thread for parsing."""
@@ -29,40 +43,37 @@ async def send_journal_prompt(client) -> str | None:
         thread_ts = resp["ts"]
 
         # Register thread so handler knows to route replies here
-        from slack_bot.handlers import register_journal_thread
         register_journal_thread(thread_ts, {"date": str(date.today())})
-        logger.info(f"Journal prompt sent (thread {thread_ts})")
+        logger.info("Journal prompt sent (thread %s)", thread_ts)
         return thread_ts
     except Exception as e:
-        logger.error(f"Failed to send journal prompt: {e}")
+        logger.error("Failed to send journal prompt: %s", e)
         return None
 
 
 def _parse_alcohol(text: str) -> int | None:
     """Parse alcohol from reply text."""
-    text_lower = text.lower()
-    if re.search(r"\bnone\b|0\b|no\b", text_lower):
+    if _ALCOHOL_NONE_RE.search(text):
         return 0
-    m = re.search(r"(\d+)", text_lower)
+    m = _ALCOHOL_NUM_RE.search(text)
     if m:
         return int(m.group(1))
-    if "1-2" in text_lower or "one" in text_lower or "two" in text_lower:
+    if _ALCOHOL_FEW_RE.search(text):
         return 1
-    if "3+" in text_lower or "three" in text_lower or "few" in text_lower:
+    if _ALCOHOL_MANY_RE.search(text):
         return 3
     return None
 
 
 def _parse_stress(text: str) -> int | None:
-    m = re.search(r"\b([1-5])\b", text)
+    m = _STRESS_RE.search(text)
     return int(m.group(1)) if m else None
 
 
 def _parse_bool(text: str) -> bool | None:
-    text_lower = text.lower()
-    if re.search(r"\by(es)?\b|yeah|yep|true", text_lower):
+    if _YES_RE.search(text):
         return True
-    if re.search(r"\bno?\b|nope|nah|false", text_lower):
+    if _NO_RE.search(text):
         return False
     return None
 
@@ -86,7 +97,10 @@ def parse_journal_text(text: str) -> dict:
 
     for i, line in enumerate(lines):
         # Remove leading number/dot (e.g. "1. " or "1) ")
-        clean = re.sub(r"^\d+[\.\)]\s*", "", line)
+        if line.startswith(_PREFIXES):
+            clean = line[3:].lstrip()
+        else:
+            clean = _LEADING_NUM_RE.sub("", line, count=1)
 
         if i == 0 or "alcohol" in clean.lower():
             result["alcohol_units"] = _parse_alcohol(clean)
@@ -100,21 +114,21 @@ def parse_journal_text(text: str) -> dict:
     if notes_parts:
         result["notes"] = " ".join(notes_parts)
 
-    # Fallback: scan whole text for anything we missed
-    if result["alcohol_units"] is None:
-        result["alcohol_units"] = _parse_alcohol(text)
-    if result["stress_level"] is None:
-        result["stress_level"] = _parse_stress(text)
-    if result["late_caffeine"] is None:
-        result["late_caffeine"] = _parse_bool(text)
+    # Fallback for mashed-together replies: scan the whole text for anything we missed.
+    # A reply with one line per question was already scanned piecewise above.
+    if len(lines) < 3:
+        if result["alcohol_units"] is None:
+            result["alcohol_units"] = _parse_alcohol(text)
+        if result["stress_level"] is None:
+            result["stress_level"] = _parse_stress(text)
+        if result["late_caffeine"] is None:
+            result["late_caffeine"] = _parse_bool(text)
 
     return result
 
 
 async def parse_journal_reply(thread_ts: str, text: str, reply_ts: str, client):
     """Parse user's threaded reply and save to DB."""
-    from slack_bot.handlers import unregister_journal_thread
-
     parsed = parse_journal_text(text)
     today = date.today()
 
@@ -139,6 +153,10 @@ async def parse_journal_reply(thread_ts: str, text: str, reply_ts: str, client):
                 late_caffeine=parsed["late_caffeine"],
                 notes=parsed["notes"],
             ))
+        db.flush()
+        refresh_daily_summary(db, since=today)
+
+    clear_context_cache()
 
     unregister_journal_thread(thread_ts)
 
@@ -159,6 +177,6 @@ async def parse_journal_reply(thread_ts: str, text: str, reply_ts: str, client):
             text=f"✅ {confirm}",
         )
     except Exception as e:
-        logger.warning(f"Could not confirm journal entry: {e}")
+        logger.warning("Could not confirm journal entry: %s", e)
 
-    logger.info(f"Journal entry saved for {today}: {parsed}")
+    logger.info("Journal entry saved for %s: %s", today, parsed)
@@ -1,5 +1,5 @@
 """
-Entry point — starts the Slack bot and APScheduler.
+Entry point — starts the Slack bot, the Whoop webhook receiver and APScheduler.
 
 Usage:
     python main.py
@@ -24,6 +24,22 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+async def _run_webhook_server():
+    """
+    The webhook receiver is optional — the scheduled polls cover the same data. If it
+    can't start (uvicorn calls sys.exit when the port won't bind), log and alert instead
+    of letting the SystemExit take Socket Mode and the scheduler down with it.
+    """
+    from slack_bot.alerts import notify_error
+    from whoop.webhook import start_webhook_server
+
+    try:
+        await start_webhook_server()
+    except (Exception, SystemExit) as e:
+        logger.error(f"Webhook server stopped: {e!r} — continuing without it")
+        await notify_error("Webhook server", RuntimeError(f"webhook server stopped: {e!r}"))
+
+
 async def main():
     from db.database import init_db
     from slack_bot.app import app, start_socket_mode
@@ -51,8 +67,15 @@ async def main():
     for job in scheduler.get_jobs():
         logger.info(f"  - {job.name} → next run: {job.next_run_time}")
 
-    # Slack Socket Mode (blocks until stopped)
-    await start_socket_mode()
+    # Webhook receiver runs alongside; Slack Socket Mode blocks until stopped
+    webhook_task = asyncio.create_task(_run_webhook_server())
+    try:
+        await start_socket_mode()
+    finally:
+        webhook_task.cancel()
+        # Insights are persisted in the background — don't lose the pending batch on stop
+        from ai.analyzer import flush_insights
+        await flush_insights()
 
 
 if __name__ == "__main__":
@@ -5,48 +5,54 @@ All times are in the configured TIMEZONE.
 
 import logging
 import os
+from zoneinfo import ZoneInfo
 
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
 from apscheduler.triggers.cron import CronTrigger
-import pytz
 
-from config.settings import MORNING_HOUR, EVENING_JOURNAL_HOUR, TIMEZONE
+from ai.analyzer import analyze_flags
+from ai.context import get_hrv_baseline
+from ai.flags import run_all_checks
+from config.settings import MORNING_HOUR, EVENING_JOURNAL_HOUR, SLACK_USER_ID, TIMEZONE
+from db.database import get_db
+from journal.flow import send_journal_prompt
+from slack_bot.alerts import notify_error, notify_sync_success
+from slack_bot.morning import post_morning_message
+from slack_bot.weekly import post_weekly_report
+from whoop.auth import refresh_tokens, save_tokens
+from whoop.sync import sync_all
+from whoop.token_store import days_since_last_refresh
 
 logger = logging.getLogger(__name__)
 
+_TZ = ZoneInfo(TIMEZONE)
+
 
 async def _ensure_token_fresh(slack_client):
     """Refresh tokens if > 20 days old. Called at top of each data-fetching job."""
-    from whoop.token_store import days_since_last_refresh
-    from whoop.auth import refresh_tokens, save_tokens
-    from slack_bot.alerts import notify_error
 
     age = days_since_last_refresh()
     if age is None or age < 20:
         return  # fresh enough
 
-    logger.info(f"Token is {age} days old — proactively refreshing")
+    logger.info("Token is %s days old — proactively refreshing", age)
     try:
         tokens = await refresh_tokens(os.getenv("WHOOP_REFRESH_TOKEN"))
         save_tokens(tokens)
         logger.info("Proactive token refresh succeeded")
     except Exception as e:
-        logger.error(f"Proactive token refresh failed: {e}")
+        logger.error("Proactive token refresh failed: %s", e)
         await notify_error("Proactive token refresh", e)
 
 
 async def _morning_job(slack_client):
-    from slack_bot.morning import post_morning_message
-    from slack_bot.alerts import notify_sync_success, notify_error
-    from whoop.sync import sync_all
-
     await _ensure_token_fresh(slack_client)
     logger.info("Running morning job: sync + morning message")
     try:
         counts = await sync_all(days=3)
         await notify_sync_success("Morning", counts, days=3)
     except Exception as e:
-        logger.error(f"Morning sync failed: {e}")
+        logger.error("Morning sync failed: %s", e)
         await notify_error("Morning sync", e)
 
     await post_morning_message(slack_client)
@@ -54,61 +60,49 @@ async def _morning_job(slack_client):
 
 async def _midday_sync_job(slack_client):
     """Mid-day sync + re-check flags."""
-    from whoop.sync import sync_all
-    from ai.flags import run_all_checks
-    from ai.context import get_hrv_baseline
-    from ai.analyzer import analyze_flags
-    from slack_bot.alerts import notify_sync_success, notify_error
-    from config.settings import SLACK_USER_ID
-
     await _ensure_token_fresh(slack_client)
     logger.info("Running midday sync")
     try:
         counts = await sync_all(days=1)
         await notify_sync_success("Midday", counts, days=1)
     except Exception as e:
-        logger.error(f"Midday sync failed: {e}")
+        logger.error("Midday sync failed: %s", e)
         await notify_error("Midday sync", e)
         return
 
-    hrv_baseline = get_hrv_baseline()
-    flags = run_all_checks(hrv_baseline=hrv_baseline)
+    with get_db() as db:
+        hrv_baseline = get_hrv_baseline(db=db)
+        flags = run_all_checks(hrv_baseline=hrv_baseline, db=db)
     if flags:
-        alert_text = analyze_flags(flags)
+        alert_text = await analyze_flags(flags)
         if alert_text:
             await slack_client.chat_postMessage(channel=SLACK_USER_ID, text=f"⚠️ Midday alert:\n{alert_text}")
 
 
 async def _evening_journal_job(slack_client):
-    from journal.flow import send_journal_prompt
     logger.info("Running evening journal prompt")
     await send_journal_prompt(slack_client)
 
 
 async def _weekly_job(slack_client):
-    from whoop.sync import sync_all
-    from slack_bot.weekly import post_weekly_report
-    from slack_bot.alerts import notify_sync_success, notify_error
-
     await _ensure_token_fresh(slack_client)
     logger.info("Running weekly report job")
     try:
         counts = await sync_all(days=7)
         await notify_sync_success("Weekly", counts, days=7)
     except Exception as e:
-        logger.error(f"Weekly sync failed: {e}")
+        logger.error("Weekly sync failed: %s", e)
         await notify_error("Weekly sync", e)
 
     await post_weekly_report(slack_client)
 
 
 def create_scheduler(slack_client) -> AsyncIOScheduler:
-    tz = pytz.timezone(TIMEZONE)
-    scheduler = AsyncIOScheduler(timezone=tz)
+    scheduler = AsyncIOScheduler(timezone=_TZ)
 
     scheduler.add_job(
         _morning_job,
-        CronTrigger(hour=MORNING_HOUR, minute=0, timezone=tz),
+        CronTrigger(hour=MORNING_HOUR, minute=0, timezone=_TZ),
         args=[slack_client],
         id="morning",
         name="Morning health summary",
@@ -117,7 +111,7 @@ def create_scheduler(slack_client) -> AsyncIOScheduler:
 
     scheduler.add_job(
         _midday_sync_job,
-        CronTrigger(hour=13, minute=0, timezone=tz),
+        CronTrigger(hour=13, minute=0, timezone=_TZ),
         args=[slack_client],
         id="midday_sync",
         name="Midday sync + flag check",
@@ -126,7 +120,7 @@ def create_scheduler(slack_client) -> AsyncIOScheduler:
 
     scheduler.add_job(
         _evening_journal_job,
-        CronTrigger(hour=EVENING_JOURNAL_HOUR, minute=0, timezone=tz),
+        CronTrigger(hour=EVENING_JOURNAL_HOUR, minute=0, timezone=_TZ),
         args=[slack_client],
         id="evening_journal",
         name="Evening journal prompt",
@@ -136,7 +130,7 @@ def create_scheduler(slack_client) -> AsyncIOScheduler:
     # Sunday 9am weekly report
     scheduler.add_job(
         _weekly_job,
-        CronTrigger(day_of_week="sun", hour=9, minute=0, timezone=tz),
+        CronTrigger(day_of_week="sun", hour=9, minute=0, timezone=_TZ),
         args=[slack_client],
         id="weekly_report",
         name="Weekly health report",
@@ -10,6 +10,8 @@ import asyncio
 import logging
 from datetime import datetime, timezone
 
+from config.settings import SLACK_USER_ID
+
 logger = logging.getLogger(__name__)
 
 _slack_client = None
@@ -25,31 +27,27 @@ async def notify_sync_success(job_name: str, counts: dict, days: int):
     """Post a brief sync-success ping after a scheduled Whoop sync."""
     if _slack_client is None:
         return
-    from config.settings import SLACK_USER_ID
-
     parts = [f"{k}: +{v}" for k, v in counts.items() if v > 0]
     detail = ", ".join(parts) if parts else "no new records"
     text = f"✅ *{job_name}* sync done — {detail} (last {days}d)"
     try:
         await _slack_client.chat_postMessage(channel=SLACK_USER_ID, text=text)
     except Exception as e:
-        logger.error(f"Failed to post sync-success alert: {e}")
+        logger.error("Failed to post sync-success alert: %s", e)
 
 
 async def notify_error(source: str, error: Exception, context: str = ""):
     """Post a 🚨 error alert to Slack."""
     if _slack_client is None:
-        logger.error(f"[{source}] {error} — no Slack client configured for alerts")
+        logger.error("[%s] %s — no Slack client configured for alerts", source, error)
         return
-    from config.settings import SLACK_USER_ID
-
     ts = datetime.now(timezone.utc).strftime("%H:%M UTC")
     ctx_line = f"\n_{context}_" if context else ""
     text = f"🚨 *{source} error* ({ts})\n```{error}```{ctx_line}"
     try:
         await _slack_client.chat_postMessage(channel=SLACK_USER_ID, text=text)
     except Exception as e:
-        logger.error(f"Failed to post error alert: {e}")
+        logger.error("Failed to post error alert: %s", e)
 
 
 def schedule_alert(source: str, error: Exception, context: str = ""):
@@ -58,10 +56,11 @@ def schedule_alert(source: str, error: Exception, context: str = ""):
     Requires a running asyncio event loop (always true inside APScheduler jobs).
     """
     try:
-        loop = asyncio.get_event_loop()
-        if loop.is_running():
-            loop.create_task(notify_error(source, error, context))
-        else:
-            logger.error(f"[{source}] {error} (no running loop to send alert)")
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        logger.error("[%s] %s (no running loop to send alert)", source, error)
+        return
+    try:
+        loop.create_task(notify_error(source, error, context))
     except Exception as inner:
-        logger.error(f"[{source}] {error} — schedule_alert itself failed: {inner}")
+        logger.error("[%s] %s — schedule_alert itself failed: %s", source, error, inner)
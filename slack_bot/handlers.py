@@ -8,11 +8,14 @@ import re
 
 from ai.analyzer import answer_question
 from config.settings import SLACK_USER_ID
+from journal.flow import parse_journal_reply
+from scheduler.jobs import _ensure_token_fresh
+from slack_bot.journal_registry import is_pending_journal_thread
+from whoop.sync import sync_all
 
 logger = logging.getLogger(__name__)
 
-# Journal reply parsing state — keyed by thread_ts
-_pending_journal_threads: dict[str, dict] = {}
+_MENTION_RE = re.compile(r"<@[^>]+>")
 
 
 def register_handlers(app):
@@ -31,28 +34,27 @@ def register_handlers(app):
         if event.get("bot_id"):
             return
 
-        logger.info(f"Message event — user: {user}, channel_type: {channel_type}, expected_user: {SLACK_USER_ID}")
+        logger.info("Message event — user: %s, channel_type: %s, expected_user: %s", user, channel_type, SLACK_USER_ID)
 
         # Only respond to messages from Jay
         if user != SLACK_USER_ID:
-            logger.warning(f"Ignoring message from unexpected user: {user}")
+            logger.warning("Ignoring message from unexpected user: %s", user)
             return
 
         # If this is a thread reply to a pending journal prompt, handle it
-        if thread_ts and thread_ts in _pending_journal_threads:
-            from journal.flow import parse_journal_reply
+        if thread_ts and is_pending_journal_thread(thread_ts):
             await parse_journal_reply(thread_ts, text, ts, client)
             return
 
         # Direct message Q&A
         if channel_type == "im" and text:
-            logger.info(f"Q&A question received: {text[:80]}")
+            logger.info("Q&A question received: %s", text[:80])
             try:
                 await client.reactions_add(channel=event["channel"], timestamp=ts, name="thinking_face")
             except Exception:
                 pass
 
-            answer = answer_question(text)
+            answer = await answer_question(text)
 
             await say(text=answer, thread_ts=ts)
             try:
@@ -63,13 +65,13 @@ def register_handlers(app):
     @app.event("app_mention")
     async def handle_mention(event, say):
         """Handle @mentions in any channel."""
-        text = re.sub(r"<@[^>]+>", "", event.get("text", "")).strip()
+        text = _MENTION_RE.sub("", event.get("text", "")).strip()
         if not text:
             await say("Hey! Ask me anything about your health data.")
             return
 
-        logger.info(f"Mention Q&A: {text[:80]}")
-        answer = answer_question(text)
+        logger.info("Mention Q&A: %s", text[:80])
+        answer = await answer_question(text)
         await say(text=answer, thread_ts=event.get("ts"))
 
 
@@ -85,9 +87,6 @@ def register_handlers(app):
 
         await ack(text=f"⏳ Syncing last {days} day{'s' if days != 1 else ''}...")
 
-        from scheduler.jobs import _ensure_token_fresh
-        from whoop.sync import sync_all
-
         await _ensure_token_fresh(client)
 
         channel = command["channel_id"]
@@ -100,16 +99,7 @@ def register_handlers(app):
                 f"(last {days}d)"
             )
         except Exception as e:
-            logger.error(f"Manual /sync failed: {e}")
+            logger.error("Manual /sync failed: %s", e)
             msg = f"❌ Sync failed: {e}"
 
         await client.chat_postMessage(channel=channel, text=msg)
-
-
-def register_journal_thread(thread_ts: str, metadata: dict):
-    """Called by journal flow to register a pending thread."""
-    _pending_journal_threads[thread_ts] = metadata
-
-
-def unregister_journal_thread(thread_ts: str):
-    _pending_journal_threads.pop(thread_ts, None)
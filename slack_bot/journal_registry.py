@@ -0,0 +1,36 @@
+"""
+Pending journal threads — thread_ts → (expires_at, metadata).
+Its own module so journal/flow.py and slack_bot/handlers.py can both import it at top level.
+Threads nobody replies to expire after two days instead of accumulating for the life of the process.
+"""
+
+import time
+
+_JOURNAL_THREAD_TTL = 48 * 3600
+_pending_journal_threads: dict[str, tuple[float, dict]] = {}
+
+
+def _prune_journal_threads(now: float):
+    for ts in [ts for ts, (expires_at, _) in _pending_journal_threads.items() if expires_at <= now]:
+        del _pending_journal_threads[ts]
+
+
+def is_pending_journal_thread(thread_ts: str) -> bool:
+    entry = _pending_journal_threads.get(thread_ts)
+    if entry is None:
+        return False
+    if entry[0] <= time.monotonic():
+        del _pending_journal_threads[thread_ts]
+        return False
+    return True
+
+
+def register_journal_thread(thread_ts: str, metadata: dict):
+    """Called by journal flow to register a pending thread."""
+    now = time.monotonic()
+    _prune_journal_threads(now)
+    _pending_journal_threads[thread_ts] = (now + _JOURNAL_THREAD_TTL, metadata)
+
+
+def unregister_journal_thread(thread_ts: str):
+    _pending_journal_threads.pop(thread_ts, None)
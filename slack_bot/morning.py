@@ -1,13 +1,14 @@
 """Builds and posts the morning health summary to Slack."""
 
+import asyncio
 import logging
-from datetime import date, datetime, timedelta, timezone
+from datetime import date, datetime, time, timedelta, timezone
 
 from ai.analyzer import generate_daily_insight, analyze_flags
-from ai.context import build_daily_context, get_hrv_baseline, get_rhr_baseline
+from ai.context import build_daily_context, get_baselines
 from ai.flags import run_all_checks
 from config.settings import SLACK_USER_ID, DASHBOARD_URL
-from db.database import get_db
+from db.database import get_db, use_db
 from db.models import WhoopRecovery, WhoopSleep
 
 logger = logging.getLogger(__name__)
@@ -36,72 +37,85 @@ def _pct(part: int | None, total: int | None) -> str:
     return f"{round(part / total * 100)}%"
 
 
-def _get_today_data(target_date: date) -> dict:
+def _get_today_data(target_date: date, db=None) -> dict:
     """Pull today's recovery and sleep as plain dicts within one session."""
-    window_start = datetime(target_date.year, target_date.month, target_date.day,
-                            tzinfo=timezone.utc) - timedelta(days=1)
+    window_start = datetime.combine(target_date, time.min, tzinfo=timezone.utc) - timedelta(days=1)
     window_end = window_start + timedelta(days=2)
 
-    with get_db() as db:
+    with use_db(db) as db:
+        # Project just the columns the message uses; labels double as the dict keys
         r = (
-            db.query(WhoopRecovery)
+            db.query(
+                WhoopRecovery.recovery_score.label("score"),
+                WhoopRecovery.hrv_rmssd_milli.label("hrv"),
+                WhoopRecovery.resting_heart_rate.label("rhr"),
+                WhoopRecovery.spo2_percentage.label("spo2"),
+                WhoopRecovery.skin_temp_celsius.label("skin_temp"),
+            )
             .filter(WhoopRecovery.created_at >= window_start)
             .filter(WhoopRecovery.created_at < window_end)
             .order_by(WhoopRecovery.created_at.desc())
             .first()
         )
-        recovery = {
-            "score": r.recovery_score,
-            "hrv": r.hrv_rmssd_milli,
-            "rhr": r.resting_heart_rate,
-            "spo2": r.spo2_percentage,
-            "skin_temp": r.skin_temp_celsius,
-        } if r else {}
-
         s = (
-            db.query(WhoopSleep)
+            db.query(
+                WhoopSleep.total_in_bed_milli.label("total_milli"),
+                WhoopSleep.slow_wave_milli.label("deep_milli"),
+                WhoopSleep.rem_sleep_milli.label("rem_milli"),
+                WhoopSleep.light_sleep_milli.label("light_milli"),
+                WhoopSleep.sleep_performance_pct.label("performance_pct"),
+                WhoopSleep.sleep_efficiency_pct.label("efficiency_pct"),
+                WhoopSleep.awake_count.label("disturbances"),
+                WhoopSleep.sleep_debt_milli.label("debt_milli"),
+                WhoopSleep.respiratory_rate.label("respiratory_rate"),
+            )
             .filter(WhoopSleep.end >= window_start)
             .filter(WhoopSleep.end < window_end)
             .filter(WhoopSleep.nap.isnot(True))
             .order_by(WhoopSleep.end.desc())
             .first()
         )
-        sleep = {
-            "total_milli": s.total_in_bed_milli,
-            "deep_milli": s.slow_wave_milli,
-            "rem_milli": s.rem_sleep_milli,
-            "light_milli": s.light_sleep_milli,
-            "performance_pct": s.sleep_performance_pct,
-            "efficiency_pct": s.sleep_efficiency_pct,
-            "disturbances": s.awake_count,
-            "debt_milli": s.sleep_debt_milli,
-            "respiratory_rate": s.respiratory_rate,
-        } if s else {}
 
+    recovery = r._asdict() if r else {}
+    sleep = s._asdict() if s else {}
     return {"recovery": recovery, "sleep": sleep}
 
 
-def build_morning_message(target_date: date | None = None) -> str:
-    target_date = target_date or date.today()
-    data = _get_today_data(target_date)
-    hrv_baseline = get_hrv_baseline()
-    rhr_baseline = get_rhr_baseline()
-    flags = run_all_checks(hrv_baseline=hrv_baseline)
-    context = build_daily_context(target_date)
+def _gather_morning_data(target_date: date) -> tuple[dict, tuple, list, str]:
+    """Every blocking read the message needs — (data, baselines, flags, context) from one session."""
+    with get_db() as db:
+        data = _get_today_data(target_date, db=db)
+        baselines = get_baselines(db=db)
+        flags = run_all_checks(hrv_baseline=baselines[0], db=db)
+        context = build_daily_context(target_date, baselines=baselines, db=db)
+    return data, baselines, flags, context
 
-    rec = data["recovery"]
-    slp = data["sleep"]
+
+async def build_morning_message(target_date: date | None = None) -> str:
+    target_date = target_date or date.today()
+    # DB reads run off the event loop so Slack events keep flowing meanwhile
+    data, baselines, flags, context = await asyncio.to_thread(_gather_morning_data, target_date)
 
     # ---- AI insight (generated first, displayed first) ----
     insight = ""
     try:
-        insight = generate_daily_insight(context, flags)
+        insight = await generate_daily_insight(context, flags, baselines=baselines)
         insight = " ".join(insight.splitlines()).strip()
     except Exception as e:
-        logger.warning(f"Could not generate insight: {e}")
+        logger.warning("Could not generate insight: %s", e)
         from slack_bot.alerts import schedule_alert
         schedule_alert("Gemini/morning-insight", e)
 
+    return _render_morning_message(target_date, data, baselines, flags, insight)
+
+
+def _render_morning_message(
+    target_date: date, data: dict, baselines: tuple, flags: list, insight: str,
+) -> str:
+    rec = data["recovery"]
+    slp = data["sleep"]
+    hrv_baseline, rhr_baseline = baselines
+
     lines = [f"*Morning Health Summary — {target_date}*", ""]
 
     if insight:
@@ -146,14 +160,18 @@ def build_morning_message(target_date: date | None = None) -> str:
     # ---- Sleep block ----
     lines.append("")
     if slp:
-        total_str = _milli_to_hm(slp.get("total_milli"))
-        deep_pct = _pct(slp.get("deep_milli"), slp.get("total_milli"))
-        rem_pct = _pct(slp.get("rem_milli"), slp.get("total_milli"))
-        light_pct = _pct(slp.get("light_milli"), slp.get("total_milli"))
+        total = slp.get("total_milli")
+        perf_raw = slp.get("performance_pct")
+        eff_raw = slp.get("efficiency_pct")
+
+        total_str = _milli_to_hm(total)
+        deep_pct = _pct(slp.get("deep_milli"), total)
+        rem_pct = _pct(slp.get("rem_milli"), total)
+        light_pct = _pct(slp.get("light_milli"), total)
         debt_str = _milli_to_hm(slp.get("debt_milli"))
 
-        perf = round(slp["performance_pct"], 1) if slp.get("performance_pct") else "—"
-        eff = round(slp["efficiency_pct"], 1) if slp.get("efficiency_pct") else "—"
+        perf = round(perf_raw, 1) if perf_raw else "—"
+        eff = round(eff_raw, 1) if eff_raw else "—"
         lines.append(f"*Sleep: {total_str}*  |  Perf: {perf}%  |  Efficiency: {eff}%")
         lines.append(f"Stages: {deep_pct} deep  /  {rem_pct} REM  /  {light_pct} light")
         if slp.get("disturbances") is not None:
@@ -175,9 +193,9 @@ def build_morning_message(target_date: date | None = None) -> str:
 
 
 async def post_morning_message(client, target_date: date | None = None):
-    text = build_morning_message(target_date)
+    text = await build_morning_message(target_date)
     try:
         await client.chat_postMessage(channel=SLACK_USER_ID, text=text)
         logger.info("Morning message posted to Slack")
     except Exception as e:
-        logger.error(f"Failed to post morning message: {e}")
+        logger.error("Failed to post morning message: %s", e)
@@ -9,8 +9,8 @@ logger = logging.getLogger(__name__)
 DASHBOARD_URL = "http://localhost:8501"
 
 
-def build_weekly_message() -> str:
-    report = generate_weekly_report()
+async def build_weekly_message() -> str:
+    report = await generate_weekly_report()
     lines = [
         "*📊 Weekly Health Report*",
         "",
@@ -22,9 +22,9 @@ def build_weekly_message() -> str:
 
 
 async def post_weekly_report(client):
-    text = build_weekly_message()
+    text = await build_weekly_message()
     try:
         await client.chat_postMessage(channel=SLACK_USER_ID, text=text)
         logger.info("Weekly report posted to Slack")
     except Exception as e:
-        logger.error(f"Failed to post weekly report: {e}")
+        logger.error("Failed to post weekly report: %s", e)
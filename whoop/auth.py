@@ -11,12 +11,10 @@ No local server required.
 import asyncio
 import os
 import secrets
+import shutil
 import urllib.parse
 from pathlib import Path
 
-import httpx
-from dotenv import load_dotenv, set_key
-
 from config.settings import (
     WHOOP_AUTH_URL,
     WHOOP_CLIENT_ID,
@@ -25,6 +23,7 @@ from config.settings import (
     WHOOP_SCOPES,
     WHOOP_TOKEN_URL,
 )
+from whoop.http_client import get_http_client
 
 ENV_PATH = Path(__file__).resolve().parents[1] / ".env"
 
@@ -42,36 +41,59 @@ def _build_auth_url() -> tuple[str, str]:
 
 
 async def exchange_code(code: str) -> dict:
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(
-            WHOOP_TOKEN_URL,
-            data={
-                "client_id": WHOOP_CLIENT_ID,
-                "client_secret": WHOOP_CLIENT_SECRET,
-                "code": code,
-                "redirect_uri": WHOOP_REDIRECT_URI,
-                "grant_type": "authorization_code",
-            },
-        )
-        resp.raise_for_status()
-        return resp.json()
+    resp = await get_http_client().post(
+        WHOOP_TOKEN_URL,
+        data={
+            "client_id": WHOOP_CLIENT_ID,
+            "client_secret": WHOOP_CLIENT_SECRET,
+            "code": code,
+            "redirect_uri": WHOOP_REDIRECT_URI,
+            "grant_type": "authorization_code",
+        },
+    )
+    resp.raise_for_status()
+    return resp.json()
 
 
 async def refresh_tokens(refresh_token: str) -> dict:
     """Exchange a refresh token for new access + refresh tokens."""
-    async with httpx.AsyncClient() as client:
-        resp = await client.post(
-            WHOOP_TOKEN_URL,
-            data={
-                "client_id": WHOOP_CLIENT_ID,
-                "client_secret": WHOOP_CLIENT_SECRET,
-                "refresh_token": refresh_token,
-                "grant_type": "refresh_token",
-                "scope": WHOOP_SCOPES,
-            },
-        )
-        resp.raise_for_status()
-        return resp.json()
+    resp = await get_http_client().post(
+        WHOOP_TOKEN_URL,
+        data={
+            "client_id": WHOOP_CLIENT_ID,
+            "client_secret": WHOOP_CLIENT_SECRET,
+            "refresh_token": refresh_token,
+            "grant_type": "refresh_token",
+            "scope": WHOOP_SCOPES,
+        },
+    )
+    resp.raise_for_status()
+    return resp.json()
+
+
+def _write_env_tokens(tokens: dict):
+    """
+    Rewrite both token lines of .env in one pass and swap the file in atomically, so it
+    never holds a new access token next to an old refresh token. Other lines are kept as-is.
+    """
+    values = {
+        "WHOOP_ACCESS_TOKEN": tokens["access_token"],
+        "WHOOP_REFRESH_TOKEN": tokens["refresh_token"],
+    }
+    lines = []
+    for line in ENV_PATH.read_text().splitlines():
+        key = line.split("=", 1)[0].strip()
+        if key in values:
+            line = f"{key}='{values.pop(key)}'"
+        lines.append(line)
+    lines.extend(f"{key}='{value}'" for key, value in values.items())
+
+    tmp = ENV_PATH.with_suffix(".tmp")
+    # Give the temp file .env's mode (typically 0600) before any secret is written to it
+    tmp.touch(mode=0o600)
+    shutil.copymode(ENV_PATH, tmp)
+    tmp.write_text("\n".join(lines) + "\n")
+    os.replace(tmp, ENV_PATH)
 
 
 def save_tokens(tokens: dict):
@@ -80,8 +102,7 @@ def save_tokens(tokens: dict):
     save_tokens_to_db(tokens)
     try:  # local dev: also write .env
         if ENV_PATH.exists():
-            set_key(str(ENV_PATH), "WHOOP_ACCESS_TOKEN", tokens["access_token"])
-            set_key(str(ENV_PATH), "WHOOP_REFRESH_TOKEN", tokens["refresh_token"])
+            _write_env_tokens(tokens)
     except Exception:
         pass
 
@@ -123,5 +144,4 @@ def run_oauth_flow():
 
 
 if __name__ == "__main__":
-    load_dotenv()
     run_oauth_flow()
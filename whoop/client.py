@@ -5,63 +5,108 @@ Async Whoop API client with automatic token refresh.
 import asyncio
 import logging
 import os
-from datetime import datetime, timezone
+import time
+from datetime import datetime, timedelta, timezone
 from typing import Any
 
 import httpx
-from dotenv import load_dotenv
+import orjson
 
-from config.settings import WHOOP_API_BASE
+from config.settings import SLACK_USER_ID, WHOOP_API_BASE
+from slack_bot import alerts
 from whoop.auth import refresh_tokens, save_tokens
+from whoop.http_client import get_http_client
 
-load_dotenv()
+_ISO_FMT = "%Y-%m-%dT%H:%M:%S.000Z"
+
+# Refresh this long before the access token's recorded expiry, so requests never carry a stale token
+_REFRESH_MARGIN = timedelta(minutes=5)
+
+# Shared by every WhoopClient (the webhook and scheduled syncs each build their own), so N
+# concurrent 401s produce one refresh. The tokens themselves live in os.environ, where
+# whoop.token_store keeps them; the version lets a waiter see a refresh already happened.
+_refresh_lock = asyncio.Lock()
+_token_version = 0
+
+# A dead refresh token fails every job until re-auth — DM about it at most once per interval
+_REAUTH_ALERT_INTERVAL = 300
+_last_reauth_alert: float | None = None
+_reauth_task: asyncio.Task | None = None  # keeps the fire-and-forget DM referenced until done
+
+
+def _token_expires_at() -> datetime | None:
+    """Expiry recorded by whoop.token_store, or None if unknown (then only a 401 triggers a refresh)."""
+    try:
+        return datetime.fromisoformat(os.environ["WHOOP_TOKEN_EXPIRES_AT"])
+    except (KeyError, ValueError):
+        return None
+
+
+def _is_expiring() -> bool:
+    expires_at = _token_expires_at()
+    return expires_at is not None and datetime.now(timezone.utc) >= expires_at - _REFRESH_MARGIN
 
 
 class WhoopClient:
     def __init__(self):
-        self._access_token: str | None = os.getenv("WHOOP_ACCESS_TOKEN")
-        self._refresh_token: str | None = os.getenv("WHOOP_REFRESH_TOKEN")
         self._client: httpx.AsyncClient | None = None
-        self._refresh_lock = asyncio.Lock()
-        self._refreshed = False  # ensures only one refresh per client lifetime
 
     async def __aenter__(self):
-        self._client = httpx.AsyncClient(base_url=WHOOP_API_BASE, timeout=30)
+        # Borrow the shared keep-alive pool; it outlives this client, so __aexit__ doesn't close it
+        self._client = get_http_client()
         return self
 
     async def __aexit__(self, *args):
-        if self._client:
-            await self._client.aclose()
+        self._client = None
 
     def _auth_headers(self) -> dict:
-        return {"Authorization": f"Bearer {self._access_token}"}
+        return {"Authorization": f"Bearer {os.getenv('WHOOP_ACCESS_TOKEN')}"}
 
-    async def _refresh_if_needed(self, response: httpx.Response) -> bool:
-        if response.status_code != 401 or not self._refresh_token:
+    async def _refresh(self):
+        """Exchange the refresh token. Caller holds _refresh_lock."""
+        global _token_version
+        try:
+            tokens = await refresh_tokens(os.getenv("WHOOP_REFRESH_TOKEN"))
+        except httpx.HTTPStatusError as e:
+            if e.response.status_code == 400:
+                self._schedule_reauth_alert()
+                raise RuntimeError("WHOOP refresh token expired — re-auth required") from e
+            raise
+        save_tokens(tokens)
+        _token_version += 1
+
+    async def _ensure_fresh(self):
+        """Refresh ahead of expiry instead of paying a 401 round-trip first."""
+        if not os.getenv("WHOOP_REFRESH_TOKEN") or not _is_expiring():
+            return
+        async with _refresh_lock:
+            # Re-check: a parallel request may have refreshed while we waited for the lock
+            if _is_expiring():
+                await self._refresh()
+
+    async def _refresh_if_needed(self, response: httpx.Response, version: int) -> bool:
+        """On a 401, refresh once — unless another request already did since `version` was read."""
+        if response.status_code != 401 or not os.getenv("WHOOP_REFRESH_TOKEN"):
             return False
-        async with self._refresh_lock:
-            if self._refreshed:
-                # Another parallel request already refreshed — just retry with new token
-                return True
-            try:
-                tokens = await refresh_tokens(self._refresh_token)
-            except httpx.HTTPStatusError as e:
-                if e.response.status_code == 400:
-                    await self._notify_reauth_required()
-                    raise RuntimeError("WHOOP refresh token expired — re-auth required") from e
-                raise
-            self._access_token = tokens["access_token"]
-            self._refresh_token = tokens["refresh_token"]
-            save_tokens(tokens)
-            self._refreshed = True
+        async with _refresh_lock:
+            if _token_version == version:
+                await self._refresh()
             return True
 
+    def _schedule_reauth_alert(self):
+        """Send the re-auth DM in the background so a slow Slack API doesn't delay the error."""
+        global _last_reauth_alert, _reauth_task
+        now = time.monotonic()
+        if _last_reauth_alert is not None and now - _last_reauth_alert < _REAUTH_ALERT_INTERVAL:
+            return
+        _last_reauth_alert = now
+        _reauth_task = asyncio.get_running_loop().create_task(self._notify_reauth_required())
+
     async def _notify_reauth_required(self):
         try:
-            from slack_bot.alerts import _slack_client
-            from config.settings import SLACK_USER_ID
-            if _slack_client:
-                await _slack_client.chat_postMessage(
+            # Read through the module: init_alerts() sets the client after this module is imported
+            if alerts._slack_client:
+                await alerts._slack_client.chat_postMessage(
                     channel=SLACK_USER_ID,
                     text=(
                         "🔑 *WHOOP refresh token expired.* All jobs are paused.\n\n"
@@ -74,22 +119,25 @@ class WhoopClient:
             logging.getLogger(__name__).error(f"Failed to send re-auth DM: {e}")
 
     async def _get(self, path: str, params: dict | None = None) -> dict:
-        resp = await self._client.get(path, headers=self._auth_headers(), params=params)
-        if await self._refresh_if_needed(resp):
-            resp = await self._client.get(path, headers=self._auth_headers(), params=params)
+        await self._ensure_fresh()
+        url = WHOOP_API_BASE + path
+        version = _token_version
+        resp = await self._client.get(url, headers=self._auth_headers(), params=params)
+        if await self._refresh_if_needed(resp, version):
+            resp = await self._client.get(url, headers=self._auth_headers(), params=params)
         resp.raise_for_status()
-        return resp.json()
+        return orjson.loads(resp.content)
 
     async def _get_paginated(self, path: str, params: dict | None = None) -> list[dict]:
         """Fetch all pages of a paginated endpoint."""
-        params = params or {}
+        base_params = dict(params or {})
         results = []
         next_token = None
 
         while True:
-            if next_token:
-                params["nextToken"] = next_token
-            data = await self._get(path, params)
+            # Per-page dict — the caller's params never carry a stale nextToken
+            page_params = {**base_params, "nextToken": next_token} if next_token else base_params
+            data = await self._get(path, page_params)
             records = data.get("records", [])
             results.extend(records)
             next_token = data.get("next_token")
@@ -98,42 +146,45 @@ class WhoopClient:
 
         return results
 
+    @staticmethod
+    def _range_params(start: datetime | None, end: datetime | None) -> dict[str, Any]:
+        params: dict[str, Any] = {"limit": 25}
+        if start:
+            params["start"] = start.strftime(_ISO_FMT)
+        if end:
+            params["end"] = end.strftime(_ISO_FMT)
+        return params
+
     # ---- Public API methods ----
 
     async def get_profile(self) -> dict:
         return await self._get("/user/profile/basic")
 
     async def get_cycles(self, start: datetime | None = None, end: datetime | None = None) -> list[dict]:
-        params: dict[str, Any] = {"limit": 25}
-        if start:
-            params["start"] = start.strftime("%Y-%m-%dT%H:%M:%S.000Z")
-        if end:
-            params["end"] = end.strftime("%Y-%m-%dT%H:%M:%S.000Z")
-        return await self._get_paginated("/cycle", params)
+        return await self._get_paginated("/cycle", self._range_params(start, end))
 
     async def get_recovery(self, start: datetime | None = None, end: datetime | None = None) -> list[dict]:
-        params: dict[str, Any] = {"limit": 25}
-        if start:
-            params["start"] = start.strftime("%Y-%m-%dT%H:%M:%S.000Z")
-        if end:
-            params["end"] = end.strftime("%Y-%m-%dT%H:%M:%S.000Z")
-        return await self._get_paginated("/recovery", params)
+        return await self._get_paginated("/recovery", self._range_params(start, end))
 
     async def get_sleep(self, start: datetime | None = None, end: datetime | None = None) -> list[dict]:
-        params: dict[str, Any] = {"limit": 25}
-        if start:
-            params["start"] = start.strftime("%Y-%m-%dT%H:%M:%S.000Z")
-        if end:
-            params["end"] = end.strftime("%Y-%m-%dT%H:%M:%S.000Z")
-        return await self._get_paginated("/activity/sleep", params)
+        return await self._get_paginated("/activity/sleep", self._range_params(start, end))
 
     async def get_workouts(self, start: datetime | None = None, end: datetime | None = None) -> list[dict]:
-        params: dict[str, Any] = {"limit": 25}
-        if start:
-            params["start"] = start.strftime("%Y-%m-%dT%H:%M:%S.000Z")
-        if end:
-            params["end"] = end.strftime("%Y-%m-%dT%H:%M:%S.000Z")
-        return await self._get_paginated("/activity/workout", params)
+        return await self._get_paginated("/activity/workout", self._range_params(start, end))
+
+    # Single records, fetched by id when a webhook event names one
+
+    async def get_cycle(self, cycle_id: int) -> dict:
+        return await self._get(f"/cycle/{cycle_id}")
+
+    async def get_cycle_recovery(self, cycle_id: int) -> dict:
+        return await self._get(f"/cycle/{cycle_id}/recovery")
+
+    async def get_sleep_by_id(self, sleep_id: str) -> dict:
+        return await self._get(f"/activity/sleep/{sleep_id}")
+
+    async def get_workout_by_id(self, workout_id: str) -> dict:
+        return await self._get(f"/activity/workout/{workout_id}")
 
     async def get_body_measurement(self) -> dict:
         return await self._get("/user/measurement/body")
@@ -0,0 +1,24 @@
+"""
+Shared httpx client for Whoop — token exchanges and API calls reuse one keep-alive pool
+instead of paying a fresh TCP + TLS handshake per refresh and per sync.
+"""
+
+import asyncio
+import weakref
+
+import httpx
+
+_LIMITS = httpx.Limits(max_keepalive_connections=20, max_connections=100)
+
+# An AsyncClient's pool is bound to the event loop it first ran on, so keep one per loop
+# (the CLIs call asyncio.run separately from the bot's long-lived loop).
+_clients: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, httpx.AsyncClient]" = weakref.WeakKeyDictionary()
+
+
+def get_http_client() -> httpx.AsyncClient:
+    loop = asyncio.get_running_loop()
+    client = _clients.get(loop)
+    if client is None or client.is_closed:
+        # HTTP/2 lets sync_all's four concurrent fetches multiplex over one TLS connection
+        client = _clients[loop] = httpx.AsyncClient(http2=True, limits=_LIMITS, timeout=30)
+    return client
@@ -10,153 +10,288 @@ Usage:
 import argparse
 import asyncio
 import logging
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
+from zoneinfo import ZoneInfo
 
+from sqlalchemy import delete, select
+from sqlalchemy.dialects.postgresql import insert
+
+from ai.context import clear_context_cache
+from config.settings import TIMEZONE
 from db.database import get_db
-from db.models import WhoopCycle, WhoopRecovery, WhoopSleep, WhoopWorkout
+from db.rollup import refresh_daily_summary
+from db.models import SCORE_STATES, WhoopCycle, WhoopRecovery, WhoopSleep, WhoopWorkout
 from whoop.client import WhoopClient
 
 logger = logging.getLogger(__name__)
 
+# One sync at a time per process — the webhook, the scheduled jobs and /sync all call
+# sync_all, and overlapping runs would fetch the same records twice
+_sync_lock = asyncio.Lock()
+
 
 def _parse_dt(s: str | None) -> datetime | None:
-    if not s:
-        return None
     try:
-        # Handle both trailing Z and offset formats
-        return datetime.fromisoformat(s.replace("Z", "+00:00"))
-    except ValueError:
+        # 3.11+ parses both a trailing Z and offsets natively — no string rewriting per field
+        return datetime.fromisoformat(s)
+    except (TypeError, ValueError):  # None / malformed
         return None
 
 
+def _score_state(record: dict) -> str | None:
+    """The score_state column is an enum — store anything Whoop adds later as NULL rather than fail the sync."""
+    state = record.get("score_state")
+    if state in SCORE_STATES:
+        return state
+    if state is not None:
+        logger.warning(f"Unknown score_state {state!r} — storing NULL")
+    return None
+
+
+def _existing(db, column, keys: list) -> set:
+    """Keys already stored — one IN query per endpoint instead of a lookup per record."""
+    if not keys:
+        return set()
+    return set(db.scalars(select(column).where(column.in_(keys))))
+
+
+def _insert(db, model, rows: list[dict]) -> int:
+    """
+    Core executemany: one compiled (and cached) INSERT that the driver pages into
+    multi-row VALUES batches. ON CONFLICT DO NOTHING covers rows a concurrent sync
+    stored meanwhile; RETURNING the key counts only the rows actually inserted.
+    """
+    if not rows:
+        return 0
+    stmt = insert(model).on_conflict_do_nothing().returning(*model.__mapper__.primary_key)
+    return len(db.execute(stmt, rows).all())
+
+
+def _upsert(db, model, key, row: dict):
+    """Write one record over any stored version — webhook events carry rescores and late scores."""
+    stmt = insert(model).values(row)
+    db.execute(stmt.on_conflict_do_update(
+        index_elements=[key],
+        set_={col: stmt.excluded[col] for col in row if col != key.name},
+    ))
+
+
+# (column, API field) pairs copied straight out of each record's nested score dicts
+_CYCLE_SCORE = (
+    ("strain_score", "strain"),
+    ("kilojoules", "kilojoule"),
+    ("avg_heart_rate", "average_heart_rate"),
+    ("max_heart_rate", "max_heart_rate"),
+)
+_RECOVERY_SCORE = (
+    ("user_calibrating", "user_calibrating"),
+    ("recovery_score", "recovery_score"),
+    ("hrv_rmssd_milli", "hrv_rmssd_milli"),
+    ("resting_heart_rate", "resting_heart_rate"),
+    ("spo2_percentage", "spo2_percentage"),
+    ("skin_temp_celsius", "skin_temp_celsius"),
+)
+_SLEEP_STAGE = (
+    ("total_in_bed_milli", "total_in_bed_time_milli"),
+    ("light_sleep_milli", "total_light_sleep_time_milli"),
+    ("slow_wave_milli", "total_slow_wave_sleep_time_milli"),
+    ("rem_sleep_milli", "total_rem_sleep_time_milli"),
+    ("awake_count", "disturbance_count"),
+    ("sleep_cycle_count", "sleep_cycle_count"),
+)
+_SLEEP_SCORE = (
+    ("sleep_performance_pct", "sleep_performance_percentage"),
+    ("sleep_consistency_pct", "sleep_consistency_percentage"),
+    ("sleep_efficiency_pct", "sleep_efficiency_percentage"),
+    ("respiratory_rate", "respiratory_rate"),
+)
+_WORKOUT_SCORE = (
+    ("strain_score", "strain"),
+    ("avg_heart_rate", "average_heart_rate"),
+    ("max_heart_rate", "max_heart_rate"),
+    ("kilojoules", "kilojoule"),
+    ("distance_meter", "distance_meter"),
+)
+_WORKOUT_ZONES = (
+    "zone_zero_milli", "zone_one_milli", "zone_two_milli",
+    "zone_three_milli", "zone_four_milli", "zone_five_milli",
+)
+
+
+def _cycle_row(r: dict) -> dict:
+    score = r.get("score") or {}
+    row = {col: score.get(key) for col, key in _CYCLE_SCORE}
+    row.update(
+        id=r["id"],
+        user_id=r["user_id"],
+        start=_parse_dt(r.get("start")),
+        end=_parse_dt(r.get("end")),
+        score_state=_score_state(r),
+    )
+    return row
+
+
+def _recovery_row(r: dict) -> dict:
+    score = r.get("score") or {}
+    row = {col: score.get(key) for col, key in _RECOVERY_SCORE}
+    row.update(
+        cycle_id=r["cycle_id"],
+        sleep_id=r.get("sleep_id"),             # UUID string
+        user_id=r["user_id"],
+        score_state=_score_state(r),
+        created_at=_parse_dt(r.get("created_at")),
+    )
+    return row
+
+
+def _sleep_row(r: dict) -> dict:
+    score = r.get("score") or {}
+    stage = score.get("stage_summary") or {}
+    sleep_needed = score.get("sleep_needed") or {}
+    row = {col: stage.get(key) for col, key in _SLEEP_STAGE}
+    row.update({col: score.get(key) for col, key in _SLEEP_SCORE})
+    row.update(
+        id=r["id"],                             # UUID string
+        cycle_id=r.get("cycle_id"),
+        user_id=r["user_id"],
+        nap=r.get("nap"),
+        start=_parse_dt(r.get("start")),
+        end=_parse_dt(r.get("end")),
+        sleep_debt_milli=sleep_needed.get("need_from_sleep_debt_milli"),
+        score_state=_score_state(r),
+    )
+    return row
+
+
+def _workout_row(r: dict) -> dict:
+    score = r.get("score") or {}
+    zones = score.get("zone_duration") or {}
+    row = {col: score.get(key) for col, key in _WORKOUT_SCORE}
+    row.update({zone: zones.get(zone) for zone in _WORKOUT_ZONES})
+    row.update(
+        id=r["id"],                             # UUID string
+        cycle_id=r.get("cycle_id"),
+        user_id=r["user_id"],
+        sport_name=r.get("sport_name", "Unknown"),
+        start=_parse_dt(r.get("start")),
+        end=_parse_dt(r.get("end")),
+        score_state=_score_state(r),
+    )
+    return row
+
+
 def _sync_cycles(db, records: list[dict]) -> int:
-    saved = 0
-    for r in records:
-        if db.get(WhoopCycle, r["id"]):
-            continue
-        score = r.get("score") or {}
-        db.add(WhoopCycle(
-            id=r["id"],
-            user_id=r["user_id"],
-            start=_parse_dt(r.get("start")),
-            end=_parse_dt(r.get("end")),
-            strain_score=score.get("strain"),
-            kilojoules=score.get("kilojoule"),
-            avg_heart_rate=score.get("average_heart_rate"),
-            max_heart_rate=score.get("max_heart_rate"),
-            score_state=r.get("score_state"),
-        ))
-        saved += 1
-    return saved
+    existing = _existing(db, WhoopCycle.id, [r["id"] for r in records])
+    return _insert(db, WhoopCycle, [_cycle_row(r) for r in records if r["id"] not in existing])
 
 
 def _sync_recovery(db, records: list[dict]) -> int:
-    saved = 0
-    for r in records:
-        if db.query(WhoopRecovery).filter_by(cycle_id=r["cycle_id"]).first():
-            continue
-        score = r.get("score") or {}
-        db.add(WhoopRecovery(
-            cycle_id=r["cycle_id"],
-            sleep_id=r.get("sleep_id"),             # UUID string
-            user_id=r["user_id"],
-            user_calibrating=score.get("user_calibrating"),
-            recovery_score=score.get("recovery_score"),
-            hrv_rmssd_milli=score.get("hrv_rmssd_milli"),
-            resting_heart_rate=score.get("resting_heart_rate"),
-            spo2_percentage=score.get("spo2_percentage"),
-            skin_temp_celsius=score.get("skin_temp_celsius"),
-            score_state=r.get("score_state"),
-            created_at=_parse_dt(r.get("created_at")),
-        ))
-        saved += 1
-    return saved
+    existing = _existing(db, WhoopRecovery.cycle_id, [r["cycle_id"] for r in records])
+    return _insert(db, WhoopRecovery, [_recovery_row(r) for r in records if r["cycle_id"] not in existing])
 
 
 def _sync_sleep(db, records: list[dict]) -> int:
-    saved = 0
-    for r in records:
-        if db.get(WhoopSleep, r["id"]):
-            continue
-        score = r.get("score") or {}
-        stage = score.get("stage_summary") or {}
-        sleep_needed = score.get("sleep_needed") or {}
-        db.add(WhoopSleep(
-            id=r["id"],                             # UUID string
-            cycle_id=r.get("cycle_id"),
-            user_id=r["user_id"],
-            nap=r.get("nap"),
-            start=_parse_dt(r.get("start")),
-            end=_parse_dt(r.get("end")),
-            total_in_bed_milli=stage.get("total_in_bed_time_milli"),
-            light_sleep_milli=stage.get("total_light_sleep_time_milli"),
-            slow_wave_milli=stage.get("total_slow_wave_sleep_time_milli"),
-            rem_sleep_milli=stage.get("total_rem_sleep_time_milli"),
-            awake_count=stage.get("disturbance_count"),
-            sleep_cycle_count=stage.get("sleep_cycle_count"),
-            sleep_performance_pct=score.get("sleep_performance_percentage"),
-            sleep_consistency_pct=score.get("sleep_consistency_percentage"),
-            sleep_efficiency_pct=score.get("sleep_efficiency_percentage"),
-            respiratory_rate=score.get("respiratory_rate"),
-            sleep_debt_milli=sleep_needed.get("need_from_sleep_debt_milli"),
-            score_state=r.get("score_state"),
-        ))
-        saved += 1
-    return saved
+    existing = _existing(db, WhoopSleep.id, [r["id"] for r in records])
+    return _insert(db, WhoopSleep, [_sleep_row(r) for r in records if r["id"] not in existing])
 
 
 def _sync_workouts(db, records: list[dict]) -> int:
-    saved = 0
-    for r in records:
-        if db.get(WhoopWorkout, r["id"]):
-            continue
-        score = r.get("score") or {}
-        zones = score.get("zone_duration") or {}
-        db.add(WhoopWorkout(
-            id=r["id"],                             # UUID string
-            cycle_id=r.get("cycle_id"),
-            user_id=r["user_id"],
-            sport_name=r.get("sport_name", "Unknown"),
-            start=_parse_dt(r.get("start")),
-            end=_parse_dt(r.get("end")),
-            strain_score=score.get("strain"),
-            avg_heart_rate=score.get("average_heart_rate"),
-            max_heart_rate=score.get("max_heart_rate"),
-            kilojoules=score.get("kilojoule"),
-            distance_meter=score.get("distance_meter"),
-            zone_zero_milli=zones.get("zone_zero_milli"),
-            zone_one_milli=zones.get("zone_one_milli"),
-            zone_two_milli=zones.get("zone_two_milli"),
-            zone_three_milli=zones.get("zone_three_milli"),
-            zone_four_milli=zones.get("zone_four_milli"),
-            zone_five_milli=zones.get("zone_five_milli"),
-            score_state=r.get("score_state"),
-        ))
-        saved += 1
-    return saved
+    existing = _existing(db, WhoopWorkout.id, [r["id"] for r in records])
+    return _insert(db, WhoopWorkout, [_workout_row(r) for r in records if r["id"] not in existing])
 
 
 async def sync_all(days: int = 90):
-    """Pull all data types for the last `days` days."""
-    start = datetime.now(timezone.utc) - timedelta(days=days)
-    logger.info(f"Syncing Whoop data for last {days} days...")
+    """Pull all data types for the last `days` days. Concurrent calls run one after another."""
+    async with _sync_lock:
+        start = datetime.now(timezone.utc) - timedelta(days=days)
+        logger.info(f"Syncing Whoop data for last {days} days...")
+
+        async with WhoopClient() as client:
+            cycles_data, recovery_data, sleep_data, workout_data = await asyncio.gather(
+                client.get_cycles(start=start),
+                client.get_recovery(start=start),
+                client.get_sleep(start=start),
+                client.get_workouts(start=start),
+            )
+
+        with get_db() as db:
+            c = _sync_cycles(db, cycles_data)
+            r = _sync_recovery(db, recovery_data)
+            s = _sync_sleep(db, sleep_data)
+            w = _sync_workouts(db, workout_data)
+            refresh_daily_summary(db, since=start.date())
+
+        clear_context_cache()
+
+        logger.info(f"Sync complete — cycles: {c}, recovery: {r}, sleep: {s}, workouts: {w}")
+        return {"cycles": c, "recovery": r, "sleep": s, "workouts": w}
+
 
+# Timestamp each table is rolled up by in db/rollup.py — the day an event's record belongs to
+_DAY_COLUMN = {
+    WhoopCycle: WhoopCycle.start,
+    WhoopRecovery: WhoopRecovery.created_at,
+    WhoopSleep: WhoopSleep.end,
+    WhoopWorkout: WhoopWorkout.start,
+}
+# Row a *.deleted event removes; recovery events name the sleep the recovery was scored from
+_EVENT_KEY = {
+    "recovery": WhoopRecovery.sleep_id,
+    "sleep": WhoopSleep.id,
+    "workout": WhoopWorkout.id,
+}
+
+
+def _local_day(ts: datetime | None) -> date | None:
+    return ts.astimezone(ZoneInfo(TIMEZONE)).date() if ts else None
+
+
+async def _fetch_event_records(resource: str, record_id: str) -> list[tuple]:
+    """(model, conflict key, row) for everything a created/updated event changes."""
     async with WhoopClient() as client:
-        cycles_data, recovery_data, sleep_data, workout_data = await asyncio.gather(
-            client.get_cycles(start=start),
-            client.get_recovery(start=start),
-            client.get_sleep(start=start),
-            client.get_workouts(start=start),
-        )
-
-    with get_db() as db:
-        c = _sync_cycles(db, cycles_data)
-        r = _sync_recovery(db, recovery_data)
-        s = _sync_sleep(db, sleep_data)
-        w = _sync_workouts(db, workout_data)
-
-    logger.info(f"Sync complete — cycles: {c}, recovery: {r}, sleep: {s}, workouts: {w}")
-    return {"cycles": c, "recovery": r, "sleep": s, "workouts": w}
+        if resource == "workout":
+            workout = await client.get_workout_by_id(record_id)
+            # The workout's strain is part of its cycle's — rewrite that too
+            cycle = await client.get_cycle(workout["cycle_id"])
+            return [
+                (WhoopWorkout, WhoopWorkout.id, _workout_row(workout)),
+                (WhoopCycle, WhoopCycle.id, _cycle_row(cycle)),
+            ]
+        sleep = await client.get_sleep_by_id(record_id)
+        if resource == "sleep":
+            return [(WhoopSleep, WhoopSleep.id, _sleep_row(sleep))]
+        recovery = await client.get_cycle_recovery(sleep["cycle_id"])
+        return [(WhoopRecovery, WhoopRecovery.cycle_id, _recovery_row(recovery))]
+
+
+async def apply_event(event_type: str, record_id: str):
+    """
+    Apply one webhook event: upsert the record it names (so PENDING_SCORE rows get their
+    scores and rescores replace old values), or delete it on *.deleted, then refresh
+    daily_summary from that record's day.
+    """
+    resource, _, action = event_type.partition(".")
+    key = _EVENT_KEY.get(resource)
+    if key is None:
+        logger.info(f"Ignoring Whoop event {event_type}")
+        return
+
+    async with _sync_lock:
+        records = [] if action == "deleted" else await _fetch_event_records(resource, record_id)
+        with get_db() as db:
+            if action == "deleted":
+                model = key.class_
+                stamps = list(db.scalars(delete(model).where(key == record_id).returning(_DAY_COLUMN[model])))
+            else:
+                for model, pk, row in records:
+                    _upsert(db, model, pk, row)
+                stamps = [row[_DAY_COLUMN[model].key] for model, _, row in records]
+            since = min(filter(None, map(_local_day, stamps)), default=None)
+            if since:
+                refresh_daily_summary(db, since=since)
+
+        clear_context_cache()
+        logger.info(f"Applied Whoop event {event_type} id={record_id}")
 
 
 if __name__ == "__main__":
@@ -1,5 +1,6 @@
 import logging
 import os
+import time
 from datetime import datetime, timedelta, timezone
 
 from db.database import get_db
@@ -8,6 +9,19 @@ from db.models import OAuthToken
 logger = logging.getLogger(__name__)
 PROVIDER = "whoop"
 
+# updated_at of the stored token, cached so every job start doesn't open a session just to
+# check the token's age. Written through by save_tokens_to_db; the TTL picks up tokens
+# re-issued by another process (python -m whoop.auth).
+_UPDATED_AT_TTL = 600
+_updated_at_cache: tuple[float, datetime | None] | None = None
+
+
+def _cache_updated_at(updated_at: datetime | None) -> None:
+    global _updated_at_cache
+    if updated_at is not None and updated_at.tzinfo is None:
+        updated_at = updated_at.replace(tzinfo=timezone.utc)
+    _updated_at_cache = (time.monotonic() + _UPDATED_AT_TTL, updated_at)
+
 
 def load_tokens_from_db() -> bool:
     """On startup: DB → os.environ. Returns False if no row (first-time setup)."""
@@ -18,13 +32,20 @@ def load_tokens_from_db() -> bool:
             return False
         os.environ["WHOOP_ACCESS_TOKEN"] = row.access_token
         os.environ["WHOOP_REFRESH_TOKEN"] = row.refresh_token
+        _cache_updated_at(row.updated_at)
+        if row.expires_at is not None:
+            expires_at = row.expires_at
+            if expires_at.tzinfo is None:
+                expires_at = expires_at.replace(tzinfo=timezone.utc)
+            os.environ["WHOOP_TOKEN_EXPIRES_AT"] = expires_at.isoformat()
         logger.info("WHOOP tokens loaded from DB")
         return True
 
 
 def save_tokens_to_db(tokens: dict) -> None:
     """Upsert tokens into DB + os.environ. Called after every exchange or refresh."""
-    expires_at = datetime.now(timezone.utc) + timedelta(seconds=int(tokens.get("expires_in", 3600)))
+    now = datetime.now(timezone.utc)
+    expires_at = now + timedelta(seconds=int(tokens.get("expires_in", 3600)))
     with get_db() as db:
         row = db.query(OAuthToken).filter_by(provider=PROVIDER).first()
         if row is None:
@@ -35,20 +56,22 @@ def save_tokens_to_db(tokens: dict) -> None:
         row.expires_at = expires_at
         row.scope = tokens.get("scope", "")
         row.token_type = tokens.get("token_type", "Bearer")
-        row.updated_at = datetime.now(timezone.utc)
+        row.updated_at = now
     os.environ["WHOOP_ACCESS_TOKEN"] = tokens["access_token"]
     os.environ["WHOOP_REFRESH_TOKEN"] = tokens["refresh_token"]
+    os.environ["WHOOP_TOKEN_EXPIRES_AT"] = expires_at.isoformat()
+    _cache_updated_at(now)
     logger.info("WHOOP tokens saved to DB + os.environ")
 
 
 def days_since_last_refresh() -> int | None:
     """Return how many days since tokens were last refreshed, or None if no record."""
-    with get_db() as db:
-        row = db.query(OAuthToken).filter_by(provider=PROVIDER).first()
-        if row is None or row.updated_at is None:
-            return None
-        updated_at = row.updated_at
-        if updated_at.tzinfo is None:
-            updated_at = updated_at.replace(tzinfo=timezone.utc)
-        delta = datetime.now(timezone.utc) - updated_at
-        return delta.days
+    if _updated_at_cache is None or _updated_at_cache[0] <= time.monotonic():
+        with get_db() as db:
+            row = db.query(OAuthToken).filter_by(provider=PROVIDER).first()
+            _cache_updated_at(row.updated_at if row is not None else None)
+    updated_at = _updated_at_cache[1]
+    if updated_at is None:
+        return None
+    delta = datetime.now(timezone.utc) - updated_at
+    return delta.days
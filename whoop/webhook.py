@@ -0,0 +1,131 @@
+"""
+Whoop webhook receiver — Whoop calls POST /whoop/webhook when a recovery, sleep or
+workout is created or updated, so new data lands without waiting for the next poll.
+
+Events only say *what* changed. Each one is applied on its own — the named record is
+fetched and upserted (or deleted on *.deleted) so late scores and rescores land — and a
+short debounced sync pulls the last day for what has no events of its own (cycles),
+once per burst (sleep + recovery arrive together each morning).
+The scheduled polls in scheduler/jobs.py stay as the fallback.
+"""
+
+import asyncio
+import base64
+import hashlib
+import hmac
+import json
+import logging
+import time
+
+from fastapi import FastAPI, HTTPException, Request
+
+from config.settings import WEBHOOK_PORT, WHOOP_CLIENT_SECRET
+
+logger = logging.getLogger(__name__)
+
+_DEBOUNCE_SECONDS = 60
+_MAX_CLOCK_SKEW_SECONDS = 300   # signed timestamps older (or newer) than this are replays
+
+app = FastAPI()
+
+_pending: asyncio.Task | None = None
+_applying: set[asyncio.Task] = set()   # keeps in-flight event tasks referenced until done
+
+
+def _is_fresh(timestamp: str) -> bool:
+    """Whoop's signature timestamp is epoch milliseconds."""
+    try:
+        sent_at = int(timestamp) / 1000
+    except ValueError:
+        return False
+    return abs(time.time() - sent_at) <= _MAX_CLOCK_SKEW_SECONDS
+
+
+def _verify_signature(body: bytes, timestamp: str, signature: str) -> bool:
+    """Whoop signs base64(HMAC-SHA256(timestamp + raw body)) with the app's client secret."""
+    expected = base64.b64encode(
+        hmac.new(WHOOP_CLIENT_SECRET.encode(), timestamp.encode("latin-1") + body, hashlib.sha256).digest()
+    )
+    # Compare bytes — Starlette decodes headers as latin-1, and compare_digest raises
+    # TypeError on non-ASCII str
+    return hmac.compare_digest(expected, signature.encode("latin-1"))
+
+
+async def _debounced_sync():
+    global _pending
+    from slack_bot.alerts import notify_error
+    from whoop.sync import sync_all
+
+    await asyncio.sleep(_DEBOUNCE_SECONDS)
+    # Events arriving from here on start a new window — this sync may already have fetched
+    _pending = None
+    try:
+        # sync_all serialises with the scheduled jobs and /sync on its own lock
+        counts = await sync_all(days=1)
+        logger.info(f"Webhook sync done: {counts}")
+    except Exception as e:
+        logger.error(f"Webhook sync failed: {e}")
+        await notify_error("Webhook sync", e)
+
+
+async def _apply_event(event_type: str, record_id: str):
+    from slack_bot.alerts import notify_error
+    from whoop.sync import apply_event
+
+    try:
+        await apply_event(event_type, record_id)
+    except Exception as e:
+        logger.error(f"Applying Whoop event {event_type} id={record_id} failed: {e}")
+        await notify_error("Webhook event", e)
+
+
+def _schedule_event(event_type: str, record_id: str):
+    task = asyncio.get_running_loop().create_task(_apply_event(event_type, record_id))
+    _applying.add(task)
+    task.add_done_callback(_applying.discard)
+
+
+def _schedule_sync():
+    global _pending
+    if _pending is None:
+        _pending = asyncio.get_running_loop().create_task(_debounced_sync())
+
+
+@app.post("/whoop/webhook")
+async def whoop_webhook(request: Request):
+    body = await request.body()
+    timestamp = request.headers.get("X-WHOOP-Signature-Timestamp", "")
+    signature = request.headers.get("X-WHOOP-Signature", "")
+    if not (timestamp and signature and _verify_signature(body, timestamp, signature)):
+        raise HTTPException(status_code=401, detail="invalid signature")
+    if not _is_fresh(timestamp):
+        raise HTTPException(status_code=401, detail="stale timestamp")
+
+    try:
+        event = json.loads(body)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="invalid JSON")
+    if not isinstance(event, dict):
+        raise HTTPException(status_code=400, detail="expected a JSON object")
+
+    event_type = event.get("type") or ""
+    logger.info(f"Whoop webhook: {event_type} id={event.get('id')} trace={event.get('trace_id')}")
+    record_id = event.get("id")
+    if record_id is not None:
+        _schedule_event(event_type, str(record_id))
+    if not event_type.endswith(".deleted"):
+        _schedule_sync()
+    return {"ok": True}
+
+
+@app.get("/health")
+async def health():
+    return {"ok": True}
+
+
+async def start_webhook_server():
+    import uvicorn
+
+    config = uvicorn.Config(app, host="0.0.0.0", port=WEBHOOK_PORT, log_level="warning")
+    logger.info(f"Starting Whoop webhook server on :{WEBHOOK_PORT}...")
+    await uvicorn.Server(config).serve()